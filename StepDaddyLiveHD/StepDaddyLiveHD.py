@@ -1,14 +1,19 @@
+import time
 import reflex as rx
 import StepDaddyLiveHD.pages
 from typing import List
 from StepDaddyLiveHD import backend
 from StepDaddyLiveHD.components import navbar, card
-from StepDaddyLiveHD.step_daddy import Channel
+from StepDaddyLiveHD.step_daddy import channel_sort_key
+from StepDaddyLiveHD.channels import Channel, get_channels, channel_changes_since, status_changes_since
 
 
 class State(rx.State):
     channels: List[Channel] = []
     search_query: str = ""
+    version: int = 0
+    status_version: int = 0
+    _watching: bool = False
 
     @rx.var
     def filtered_channels(self) -> List[Channel]:
@@ -17,13 +22,70 @@ class State(rx.State):
         return [ch for ch in self.channels if self.search_query.lower() in ch.name.lower()]
 
     async def on_load(self):
-        self.channels = backend.get_channels()
+        self.channels = get_channels()
+        self.version = backend.channels_version()
+        self.status_version = backend.statuses_version()
+        if not self._watching:
+            return State.watch_channels
+
+    def _apply_delta(self, delta: dict):
+        replaced = set(delta["removed"]) | {channel.id for channel in delta["changed"]}
+        channels = [channel for channel in self.channels if channel.id not in replaced]
+        channels.extend(delta["added"])
+        channels.extend(delta["changed"])
+        self.channels = sorted(channels, key=channel_sort_key)
+
+    @rx.event(background=True)
+    async def watch_channels(self):
+        async with self:
+            if self._watching:
+                return
+            self._watching = True
+            token = self.router.session.client_token
+            version = self.version
+            status_version = self.status_version
+        deadline = time.monotonic() + 6 * 3600
+        try:
+            while time.monotonic() < deadline and connected(token):
+                await backend.wait_for_channel_changes(version, timeout=60)
+                if not connected(token):
+                    break
+                if version == backend.channels_version() and status_version == backend.statuses_version():
+                    continue
+                async with self:
+                    if self.router.page.path != "/":
+                        break
+                    if self.version != backend.channels_version():
+                        deltas = channel_changes_since(self.version)
+                        if deltas is None:
+                            self.channels = get_channels()
+                        else:
+                            for delta in deltas:
+                                self._apply_delta(delta)
+                        self.version = backend.channels_version()
+                    if self.status_version != backend.statuses_version():
+                        changed = status_changes_since(self.status_version)
+                        if changed is None:
+                            self.channels = get_channels()
+                        elif changed:
+                            self._apply_delta({"added": [], "removed": [], "changed": changed})
+                        self.status_version = backend.statuses_version()
+                    version = self.version
+                    status_version = self.status_version
+        finally:
+            async with self:
+                self._watching = False
 
     @rx.event
     def set_search_query(self, value: str):
         self.search_query = value
 
 
+def connected(token: str) -> bool:
+    namespace = app.event_namespace
+    return namespace is None or token in namespace.token_to_sid
+
+
 @rx.page("/", on_load=State.on_load)
 def index() -> rx.Component:
     return rx.box(
@@ -48,7 +110,7 @@ def index() -> rx.Component:
                 rx.grid(
                     rx.foreach(
                         State.filtered_channels,
-                        lambda channel: card(channel),
+                        card,
                     ),
                     grid_template_columns="repeat(auto-fill, minmax(250px, 1fr))",
                     spacing=rx.breakpoints(
@@ -77,4 +139,5 @@ app = rx.App(
     api_transformer=backend.fastapi_app,
 )
 
-app.register_lifespan_task(backend.update_channels)
+app.register_lifespan_task(backend.run_jobs)
+app.register_lifespan_task(backend.monitor_loop)
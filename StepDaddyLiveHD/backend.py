@@ -1,31 +1,122 @@
 import os
+import time
+import anyio
 import asyncio
 import httpx
-from StepDaddyLiveHD.step_daddy import StepDaddy, Channel
-from fastapi import Response, status, FastAPI
-from fastapi.responses import JSONResponse, StreamingResponse, FileResponse
+from urllib.parse import quote
+from StepDaddyLiveHD.step_daddy import StepDaddy, StreamNotFound, InvalidPlaylistRequest
+from fastapi import Request, Response, Query, Depends, HTTPException, status, FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse, FileResponse, PlainTextResponse
 from .utils import urlsafe_base64_decode
+from .settings import config
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from . import tracing
+from .health import HealthProber
+from .prewarm import Prewarmer
+from .fastjson import dumps
+from .render_cache import RenderCache, cached_response, accepted_encoding, encoded_etag, not_modified
+from .epg import EpgBuilder, EpgDocument
+from .segment_cache import SegmentCache
+from .events import ScheduleIndex, parse_schedule, event_channels
+from .bandwidth import BandwidthScheduler
+from .debug import Profiler, MemoryTracker, LoopMonitor
+from .supervisor import Supervisor
 
 
 fastapi_app = FastAPI()
+fastapi_app.add_middleware(tracing.TracingMiddleware)
 step_daddy = StepDaddy()
 client = httpx.AsyncClient(http2=True, timeout=None, verify=False)
+prober = HealthProber(step_daddy, config.probe_concurrency, config.probe_interval)
+prewarmer = Prewarmer(step_daddy, timedelta(minutes=config.prewarm_lead), timedelta(hours=3), prober.watched)
+schedule_cache = {"time": 0.0, "version": 0, "schedule": {}, "events": [], "categories": [], "index": ScheduleIndex([], [])}
+schedule_lock = asyncio.Lock()
+render_cache = RenderCache()
+epg_builder = EpgBuilder()
+epg_lock = asyncio.Lock()
+segment_cache = SegmentCache("./segment-cache", config.segment_cache_size * 1024 * 1024, config.segment_cache_channel_size * 1024 * 1024, config.segment_cache_max_age)
+content_chunk_size = 64 * 1024
+bandwidth = BandwidthScheduler(config.egress_limit * 125000, config.client_rate_limit * 125000)
+profiler = Profiler()
+memory_tracker = MemoryTracker()
+loop_monitor = LoopMonitor(config.loop_lag_threshold / 1000)
+supervisor = Supervisor()
+content_stats = {"completed": 0, "aborted": 0, "failed": 0, "bytes": 0, "aborted_bytes": 0}
+
+
+class UpstreamStreamingResponse(StreamingResponse):
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            with anyio.CancelScope(shield=True):
+                await self.body_iterator.aclose()
+
+
+def attachment(filename: str) -> str:
+    if filename.isascii():
+        return f"attachment; filename={filename}"
+    fallback = filename.encode("ascii", "ignore").decode().strip() or "playlist.m3u8"
+    if fallback.startswith("."):
+        fallback = f"playlist{fallback}"
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
 
 
 @fastapi_app.get("/stream/{channel_id}.m3u8")
-async def stream(channel_id: str):
+async def stream(channel_id: str, segments: int | None = Query(None, ge=1), msn: int | None = Query(None, alias="_HLS_msn", ge=0)):
+    prober.hit(channel_id)
+    start = time.perf_counter()
     try:
-        return Response(
-            content=await step_daddy.stream(channel_id),
+        response = Response(
+            content=await step_daddy.stream(channel_id, segments or config.low_latency_segments, msn),
             media_type="application/vnd.apple.mpegurl",
-            headers={f"Content-Disposition": f"attachment; filename={channel_id}.m3u8"}
+            headers={"Content-Disposition": attachment(f"{channel_id}.m3u8")}
         )
-    except IndexError:
+        prober.observe(channel_id, True, time.perf_counter() - start)
+        return response
+    except (IndexError, StreamNotFound):
+        prober.observe(channel_id, False, time.perf_counter() - start)
         return JSONResponse(content={"error": "Stream not found"}, status_code=status.HTTP_404_NOT_FOUND)
+    except InvalidPlaylistRequest as e:
+        return JSONResponse(content={"error": str(e)}, status_code=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
+        prober.observe(channel_id, False, time.perf_counter() - start)
         return JSONResponse(content={"error": str(e)}, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+async def batch_stream(channel_id: str, segments: int | None, body: bool, semaphore: asyncio.Semaphore) -> dict:
+    prober.hit(channel_id)
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            playlist = await step_daddy.stream(channel_id, segments or config.low_latency_segments)
+        except (IndexError, StreamNotFound):
+            prober.observe(channel_id, False, time.perf_counter() - start)
+            return {"id": channel_id, "error": "Stream not found"}
+        except Exception as e:
+            prober.observe(channel_id, False, time.perf_counter() - start)
+            return {"id": channel_id, "error": str(e)}
+        prober.observe(channel_id, True, time.perf_counter() - start)
+    url = f"{config.api_url}/stream/{quote(channel_id)}.m3u8"
+    if segments:
+        url += f"?segments={segments}"
+    result = {"id": channel_id, "url": url}
+    if body:
+        result["playlist"] = playlist
+    return result
+
+
+@fastapi_app.get("/streams")
+async def streams(ids: str, segments: int | None = Query(None, ge=1), body: bool = False):
+    channel_ids = list(dict.fromkeys(channel_id.strip() for channel_id in ids.split(",") if channel_id.strip()))
+    if not channel_ids or len(channel_ids) > config.batch_limit:
+        return JSONResponse(content={"error": f"Pass between 1 and {config.batch_limit} channel ids"}, status_code=status.HTTP_400_BAD_REQUEST)
+    semaphore = asyncio.Semaphore(config.batch_concurrency)
+    results = await asyncio.gather(*(batch_stream(channel_id, segments, body, semaphore) for channel_id in channel_ids))
+    return {"streams": results}
+
+
 @fastapi_app.get("/key/{url}/{host}")
 async def key(url: str, host: str):
     try:
@@ -38,44 +129,363 @@ async def key(url: str, host: str):
         return JSONResponse(content={"error": str(e)}, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def file_response(path: str, media_type: str | None = None) -> Response:
+    internal = os.path.relpath(path).replace(os.sep, "/")
+    if config.accel_redirect and not internal.startswith(".."):
+        return Response(media_type=media_type, headers={"X-Accel-Redirect": quote(f"/{internal}")})
+    return FileResponse(path, media_type=media_type)
+
+
+def client_address(request: Request) -> str:
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded:
+        return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else ""
+
+
 @fastapi_app.get("/content/{path}")
-async def content(path: str):
+async def content(path: str, request: Request, c: str = ""):
+    try:
+        url = step_daddy.content_url(path)
+    except Exception as e:
+        content_stats["failed"] += 1
+        return JSONResponse(content={"error": str(e)}, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    address = client_address(request)
+    cache = segment_cache.enabled and c and segment_cache.seen(c, address, config.segment_cache_min_viewers)
+    if cache:
+        cached = segment_cache.get(url)
+        if cached:
+            return file_response(cached, "application/octet-stream")
     try:
-        async def proxy_stream():
-            async with client.stream("GET", step_daddy.content_url(path), timeout=60) as response:
-                async for chunk in response.aiter_bytes(chunk_size=64 * 1024):
-                    yield chunk
-        return StreamingResponse(proxy_stream(), media_type="application/octet-stream")
+        upstream_request = client.build_request("GET", url, timeout=60)
+        upstream = await client.send(upstream_request, stream=True)
+    except httpx.TimeoutException:
+        content_stats["failed"] += 1
+        return JSONResponse(content={"error": "Request timed out"}, status_code=status.HTTP_504_GATEWAY_TIMEOUT)
     except Exception as e:
+        content_stats["failed"] += 1
         return JSONResponse(content={"error": str(e)}, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    if upstream.status_code != 200:
+        await upstream.aclose()
+        content_stats["failed"] += 1
+        return JSONResponse(content={"error": f"Upstream returned {upstream.status_code}"}, status_code=status.HTTP_502_BAD_GATEWAY)
 
+    channel = c if prober.known(c) else ""
 
-async def update_channels():
-    while True:
+    async def proxy_stream():
+        sent = 0
+        completed = False
+        data = [] if cache else None
         try:
-            await step_daddy.load_channels()
-            await asyncio.sleep(300)
-        except asyncio.CancelledError:
-            continue
+            async for chunk in upstream.aiter_bytes(chunk_size=content_chunk_size):
+                if await request.is_disconnected():
+                    break
+                await bandwidth.acquire(address, channel, len(chunk))
+                yield chunk
+                sent += len(chunk)
+                if data is not None:
+                    data.append(chunk)
+                    if sent > segment_cache.channel_bytes:
+                        data = None
+            else:
+                completed = True
+        finally:
+            with anyio.CancelScope(shield=True):
+                await upstream.aclose()
+                if completed and data is not None:
+                    await segment_cache.put(url, c, b"".join(data))
+            content_stats["bytes"] += sent
+            if completed:
+                content_stats["completed"] += 1
+            else:
+                content_stats["aborted"] += 1
+                content_stats["aborted_bytes"] += sent
+
+    return UpstreamStreamingResponse(proxy_stream(), media_type="application/octet-stream")
+
+
+def debug_access(request: Request):
+    if not config.debug_token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Set DEBUG_TOKEN to enable the debug endpoints")
+    token = request.headers.get("x-debug-token") or request.query_params.get("token")
+    if token != config.debug_token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid debug token")
+
+
+@fastapi_app.get("/debug/stats", dependencies=[Depends(debug_access)])
+async def stats():
+    return {
+        "content": content_stats,
+        "health": prober.summary(),
+        "prewarm": {**prewarmer.stats, "targets": len(prewarmer.targets)},
+        "segment_cache": segment_cache.summary(),
+        "bandwidth": bandwidth.summary(),
+        "loop": loop_monitor.summary(),
+    }
+
+
+@fastapi_app.get("/debug/health", dependencies=[Depends(debug_access)])
+async def channel_health():
+    return {channel_id: health.as_dict() for channel_id, health in prober.index.items()}
+
+
+@fastapi_app.get("/debug/traces", dependencies=[Depends(debug_access)])
+async def traces(limit: int = 50, min_ms: float = 0):
+    return {"enabled": config.tracing, "traces": tracing.recent(limit, min_ms)}
+
+
+@fastapi_app.get("/debug/loop", dependencies=[Depends(debug_access)])
+async def loop_stalls(limit: int = Query(10, ge=1, le=50)):
+    return {**loop_monitor.summary(), "threshold_ms": config.loop_lag_threshold, "recent": list(loop_monitor.stalls)[-limit:]}
+
+
+@fastapi_app.get("/debug/profile", dependencies=[Depends(debug_access)])
+async def profile(seconds: float = Query(10, gt=0, le=120), interval_ms: float = Query(5, ge=1, le=1000)):
+    return PlainTextResponse(await profiler.profile(seconds, interval_ms / 1000))
+
+
+@fastapi_app.get("/debug/memory", dependencies=[Depends(debug_access)])
+async def memory(limit: int = Query(25, ge=1, le=500), frames: int = Query(1, ge=1, le=50), stop: bool = False):
+    if stop:
+        return memory_tracker.stop()
+    return await asyncio.to_thread(memory_tracker.snapshot, limit, frames)
+
+
+async def monitor_loop():
+    if config.loop_lag_threshold > 0:
+        await loop_monitor.run()
+
+
+async def refresh_schedule():
+    await get_schedule(force=True)
+    await update_epg()
+
+
+async def probe_tick():
+    await prober.tick()
+
+
+async def prewarm_tick():
+    await prewarmer.tick(get_schedule_events)
+
+
+async def sweep_caches():
+    step_daddy.sweep()
+    if segment_cache.enabled:
+        segment_cache.sweep()
+
+
+supervisor.add("channels", step_daddy.load_channels, 300, timeout=60)
+supervisor.add("schedule", refresh_schedule, config.schedule_ttl, timeout=60)
+if config.probe_concurrency > 0:
+    supervisor.add("probes", probe_tick, 10, cleanup=prober.cancel)
+if config.prewarm_lead > 0:
+    supervisor.add("prewarm", prewarm_tick, 30, timeout=120)
+if len(step_daddy.mirrors.mirrors) > 1 and config.mirror_probe_interval > 0:
+    supervisor.add("mirrors", step_daddy.probe_mirrors, config.mirror_probe_interval, timeout=60)
+supervisor.add("sweep", sweep_caches, 60)
+
+
+async def run_jobs():
+    await supervisor.run()
+
+
+@fastapi_app.get("/ready")
+async def ready():
+    if not step_daddy.channels:
+        return JSONResponse(content={"ready": False}, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return {"ready": True, "channels": len(step_daddy.channels), "loaded": step_daddy.loaded}
 
 
-def get_channels():
+@fastapi_app.get("/debug/mirrors", dependencies=[Depends(debug_access)])
+async def mirrors():
+    return {"active": step_daddy.mirrors.best().url, "mirrors": step_daddy.mirrors.summary()}
+
+
+@fastapi_app.get("/debug/jobs", dependencies=[Depends(debug_access)])
+async def jobs():
+    return supervisor.summary()
+
+
+def get_channel_records() -> list:
     return step_daddy.channels
 
 
-def get_channel(channel_id) -> Channel | None:
-    if not channel_id or channel_id == "":
-        return None
-    return next((channel for channel in step_daddy.channels if channel.id == channel_id), None)
+def channels_version() -> int:
+    return step_daddy.version
+
+
+def channel_changes_since(version: int) -> list[dict] | None:
+    return step_daddy.changes_since(version)
+
+
+async def wait_for_channel_changes(version: int, timeout: float = 600):
+    await step_daddy.wait_for_changes(version, timeout)
+
+
+def get_channel_statuses() -> dict[str, str]:
+    return prober.statuses()
+
+
+def statuses_version() -> int:
+    return prober.version
+
+
+def status_changes_since(version: int) -> set[str] | None:
+    return prober.changes_since(version)
+
+
+def filter_channels(tags: list[str], q: str = "", adult: bool = True) -> list:
+    channels = step_daddy.channels
+    for tag in tags:
+        tag = tag.strip().lower().lstrip("#")
+        if tag:
+            channels = [channel for channel in channels if any(t.lower().lstrip("#") == tag for t in channel.tags)]
+    if q:
+        channels = [channel for channel in channels if q in channel.name.lower()]
+    if not adult:
+        channels = [channel for channel in channels if not channel.name.startswith("18")]
+    return channels
+
+
+def playlist_response(request: Request, tags: list[str], q: str, adult: bool, filename: str) -> Response:
+    q = q.strip().lower()
+    key = ("playlist", step_daddy.version, tuple(tags), q, adult)
+    rendered = render_cache.get(key, lambda: step_daddy.playlist(filter_channels(tags, q, adult)).encode(), "application/vnd.apple.mpegurl")
+    return cached_response(request, rendered, {"Content-Disposition": attachment(filename)})
 
 
 @fastapi_app.get("/playlist.m3u8")
-def playlist():
-    return Response(content=step_daddy.playlist(), media_type="application/vnd.apple.mpegurl", headers={"Content-Disposition": "attachment; filename=playlist.m3u8"})
+async def playlist(request: Request, tag: list[str] = Query([]), q: str = "", adult: bool = True):
+    return playlist_response(request, tag, q, adult, "playlist.m3u8")
+
+
+@fastapi_app.get("/playlist/{tag}.m3u8")
+async def tag_playlist(request: Request, tag: str, q: str = "", adult: bool = True):
+    return playlist_response(request, [tag], q, adult, f"{tag.lstrip('#')}.m3u8")
+
+
+async def get_schedule(force: bool = False):
+    async with schedule_lock:
+        if force or time.monotonic() - schedule_cache["time"] > config.schedule_ttl:
+            try:
+                schedule = await step_daddy.schedule()
+            except Exception:
+                if force or not schedule_cache["time"]:
+                    raise
+            else:
+                now = datetime.now(ZoneInfo("UTC"))
+                schedule_cache["events"], schedule_cache["categories"] = parse_schedule(schedule)
+                schedule_cache["index"] = ScheduleIndex(schedule_cache["events"], schedule_cache["categories"])
+                schedule_cache["schedule"] = schedule
+                schedule_cache["time"] = time.monotonic()
+                schedule_cache["version"] += 1
+                prober.scheduled = event_channels(schedule_cache["events"], now - timedelta(hours=3), now + timedelta(hours=3))
+    return schedule_cache["schedule"]
+
+
+async def get_schedule_events():
+    await get_schedule()
+    return schedule_cache["events"], schedule_cache["categories"]
+
+
+async def get_schedule_index() -> ScheduleIndex:
+    await get_schedule()
+    return schedule_cache["index"]
+
+
+def schedule_index() -> ScheduleIndex:
+    return schedule_cache["index"]
+
+
+def parse_time(value: str | None) -> datetime | None:
+    if not value:
+        return None
+    try:
+        return datetime.fromtimestamp(float(value), ZoneInfo("UTC"))
+    except (ValueError, OverflowError, OSError):
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=ZoneInfo("UTC"))
+
+
+def render_channels(q: str, tag: str, offset: int, limit: int | None) -> bytes:
+    channels = filter_channels([tag], q)
+    page = channels[offset:None if limit is None else offset + limit]
+    return dumps({
+        "version": step_daddy.version,
+        "total": len(channels),
+        "channels": [{"id": c.id, "name": c.name, "tags": c.tags, "logo": c.logo} for c in page],
+    })
+
+
+@fastapi_app.get("/api/channels")
+async def api_channels(request: Request, q: str = "", tag: str = "", offset: int = Query(0, ge=0), limit: int | None = Query(None, ge=1)):
+    q = q.strip().lower()
+    key = ("channels", step_daddy.version, q, tag, offset, limit)
+    rendered = render_cache.get(key, lambda: render_channels(q, tag, offset, limit), "application/json")
+    return cached_response(request, rendered)
+
+
+def render_schedule(start: datetime | None, end: datetime | None, categories: set[str] | None) -> bytes:
+    events, total = schedule_cache["index"].query(categories, before=end, since=start)
+    return dumps({
+        "version": schedule_cache["version"],
+        "total": total,
+        "events": [
+            {
+                "name": event["name"],
+                "start": event["dt"].isoformat(),
+                "category": event["category"],
+                "channels": event["channels"],
+            }
+            for event in events
+        ],
+    })
+
+
+@fastapi_app.get("/api/schedule")
+async def api_schedule(request: Request, start: str | None = Query(None, alias="from"), end: str | None = Query(None, alias="to"), category: list[str] = Query([])):
+    try:
+        start, end = parse_time(start), parse_time(end)
+    except (ValueError, OverflowError, OSError):
+        return JSONResponse(content={"error": "Invalid from/to time"}, status_code=status.HTTP_400_BAD_REQUEST)
+    try:
+        await get_schedule()
+    except Exception as e:
+        return JSONResponse(content={"error": str(e)}, status_code=status.HTTP_502_BAD_GATEWAY)
+    categories = {name for value in category for name in value.split(",") if name} or None
+    key = ("schedule", schedule_cache["version"], start, end, frozenset(categories) if categories else None)
+    rendered = render_cache.get(key, lambda: render_schedule(start, end, categories), "application/json")
+    return cached_response(request, rendered)
+
+
+async def update_epg() -> EpgDocument:
+    async with epg_lock:
+        if epg_builder.version != (step_daddy.version, schedule_cache["version"]):
+            await asyncio.to_thread(epg_builder.update, step_daddy.channels, step_daddy.version, schedule_cache["events"], schedule_cache["version"])
+    return epg_builder.document
+
+
+@fastapi_app.get("/epg.xml")
+async def epg(request: Request):
+    try:
+        await get_schedule()
+    except Exception as e:
+        return JSONResponse(content={"error": str(e)}, status_code=status.HTTP_502_BAD_GATEWAY)
+    document = await update_epg()
+    encoding = accepted_encoding(request, ("gzip",))
+    etag = encoded_etag(document.etag, encoding)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if not_modified(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return StreamingResponse(document.stream(encoding), media_type="application/xml", headers=headers)
 
 
-async def get_schedule():
-    return await step_daddy.schedule()
+def write_file(path: str, content: bytes):
+    with open(path, "wb") as f:
+        f.write(content)
 
 
 @fastapi_app.get("/logo/{logo}")
@@ -85,13 +495,12 @@ async def logo(logo: str):
     if not os.path.exists("./logo-cache"):
         os.makedirs("./logo-cache")
     if os.path.exists(f"./logo-cache/{file}"):
-        return FileResponse(f"./logo-cache/{file}")
+        return file_response(f"./logo-cache/{file}")
     try:
         response = await client.get(url, headers={"user-agent": "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:137.0) Gecko/20100101 Firefox/137.0"})
         if response.status_code == 200:
-            with open(f"./logo-cache/{file}", "wb") as f:
-                f.write(response.content)
-            return FileResponse(f"./logo-cache/{file}")
+            await asyncio.to_thread(write_file, f"./logo-cache/{file}", response.content)
+            return file_response(f"./logo-cache/{file}")
         else:
             return JSONResponse(content={"error": "Logo not found"}, status_code=status.HTTP_404_NOT_FOUND)
     except httpx.ConnectTimeout:
@@ -0,0 +1,123 @@
+import time
+import heapq
+import asyncio
+from collections import Counter
+
+
+class Flow:
+    __slots__ = ("bytes", "finish", "tokens", "updated", "last_seen")
+
+    def __init__(self, now: float, tokens: float):
+        self.bytes = 0
+        self.finish = 0.0
+        self.tokens = tokens
+        self.updated = now
+        self.last_seen = now
+
+
+class BandwidthScheduler:
+    def __init__(self, egress_rate: float, client_rate: float, idle: float = 60, min_burst: int = 256 * 1024):
+        self.egress_rate = egress_rate
+        self.client_rate = client_rate
+        self.egress_burst = max(egress_rate, min_burst)
+        self.client_burst = max(client_rate, min_burst)
+        self.idle = idle
+        self.stats = {"bytes": 0, "throttled": 0, "wait": 0.0}
+        self.channels = Counter()
+        self._channel_seen: dict[str, float] = {}
+        self._flows: dict[str, Flow] = {}
+        self._queue = []
+        self._sequence = 0
+        self._virtual_time = 0.0
+        self._tokens = self.egress_burst
+        self._updated = time.monotonic()
+        self._dispatcher = None
+        self._last_prune = self._updated
+
+    @property
+    def enabled(self) -> bool:
+        return self.egress_rate > 0 or self.client_rate > 0
+
+    def _flow(self, client: str, now: float) -> Flow:
+        flow = self._flows.get(client)
+        if flow is None:
+            flow = self._flows[client] = Flow(now, self.client_burst)
+        flow.last_seen = now
+        return flow
+
+    def _prune(self, now: float):
+        self._last_prune = now
+        for key, flow in list(self._flows.items()):
+            if now - flow.last_seen > self.idle:
+                del self._flows[key]
+        for channel, last_seen in list(self._channel_seen.items()):
+            if now - last_seen > self.idle:
+                del self._channel_seen[channel]
+                del self.channels[channel]
+
+    async def acquire(self, client: str, channel: str, size: int, weight: float = 1.0):
+        now = time.monotonic()
+        if now - self._last_prune > self.idle:
+            self._prune(now)
+        flow = self._flow(client, now)
+        flow.bytes += size
+        self.channels[channel] += size
+        self._channel_seen[channel] = now
+        self.stats["bytes"] += size
+        if not self.enabled:
+            return
+        start = now
+        if self.client_rate > 0:
+            flow.tokens = min(flow.tokens + (now - flow.updated) * self.client_rate, self.client_burst)
+            flow.updated = now
+            flow.tokens -= size
+            if flow.tokens < 0:
+                await asyncio.sleep(-flow.tokens / self.client_rate)
+        if self.egress_rate > 0:
+            flow.finish = max(self._virtual_time, flow.finish) + size / weight
+            self._refill()
+            if self._queue or self._tokens < size:
+                future = asyncio.get_running_loop().create_future()
+                self._sequence += 1
+                heapq.heappush(self._queue, (flow.finish, self._sequence, size, future))
+                if self._dispatcher is None or self._dispatcher.done():
+                    self._dispatcher = asyncio.create_task(self._dispatch())
+                await future
+            else:
+                self._tokens -= size
+                self._virtual_time = flow.finish
+        waited = time.monotonic() - start
+        if waited > 0.001:
+            self.stats["throttled"] += 1
+            self.stats["wait"] += waited
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self._tokens + (now - self._updated) * self.egress_rate, self.egress_burst)
+        self._updated = now
+
+    async def _dispatch(self):
+        while self._queue:
+            finish, _, size, future = self._queue[0]
+            if future.done():
+                heapq.heappop(self._queue)
+                continue
+            self._refill()
+            if self._tokens < size:
+                await asyncio.sleep((size - self._tokens) / self.egress_rate)
+                continue
+            heapq.heappop(self._queue)
+            self._tokens -= size
+            self._virtual_time = finish
+            future.set_result(None)
+
+    def summary(self, top: int = 10) -> dict:
+        return {
+            **self.stats,
+            "egress_rate": self.egress_rate,
+            "client_rate": self.client_rate,
+            "queued": len(self._queue),
+            "clients": len(self._flows),
+            "top_clients": sorted(((client, flow.bytes) for client, flow in self._flows.items()), key=lambda item: -item[1])[:top],
+            "top_channels": self.channels.most_common(top),
+        }
@@ -0,0 +1,64 @@
+import reflex as rx
+from typing import List
+from StepDaddyLiveHD import backend
+
+
+class Channel(rx.Base):
+    id: str
+    name: str
+    tags: List[str]
+    logo: str
+    status: str = ""
+
+
+snapshot = {"version": None, "channels": [], "index": {}}
+
+
+def to_channel(record, statuses: dict[str, str]) -> Channel:
+    return Channel(id=record.id, name=record.name, tags=list(record.tags), logo=record.logo, status=statuses.get(record.id, ""))
+
+
+def channel_snapshot() -> dict:
+    version = (backend.channels_version(), backend.statuses_version())
+    if snapshot["version"] != version:
+        records = backend.get_channel_records()
+        statuses = backend.get_channel_statuses()
+        snapshot["channels"] = [to_channel(record, statuses) for record in records]
+        snapshot["index"] = {record.id: record for record in records}
+        snapshot["version"] = version
+    return snapshot
+
+
+def get_channels() -> List[Channel]:
+    return channel_snapshot()["channels"]
+
+
+def get_channel(channel_id) -> Channel | None:
+    if not channel_id or channel_id == "":
+        return None
+    record = channel_snapshot()["index"].get(channel_id)
+    return to_channel(record, backend.get_channel_statuses()) if record else None
+
+
+def channel_changes_since(version: int) -> List[dict] | None:
+    deltas = backend.channel_changes_since(version)
+    if deltas is None:
+        return None
+    statuses = backend.get_channel_statuses()
+    return [
+        {
+            "added": [to_channel(record, statuses) for record in delta["added"]],
+            "removed": delta["removed"],
+            "changed": [to_channel(record, statuses) for record in delta["changed"]],
+        }
+        for delta in deltas
+    ]
+
+
+def status_changes_since(version: int) -> List[Channel] | None:
+    changed = backend.status_changes_since(version)
+    if changed is None:
+        return None
+    index = channel_snapshot()["index"]
+    statuses = backend.get_channel_statuses()
+    return [to_channel(index[channel_id], statuses) for channel_id in changed if channel_id in index]
@@ -1,5 +1,18 @@
 import reflex as rx
-from StepDaddyLiveHD.step_daddy import Channel
+from StepDaddyLiveHD.channels import Channel
+
+
+def status_dot(status) -> rx.Component:
+    return rx.box(
+        width="10px",
+        height="10px",
+        border_radius="50%",
+        background_color=rx.match(status, ("up", "#40c057"), ("down", "#fa5252"), "transparent"),
+        position="absolute",
+        top="0",
+        right="0",
+        title=status,
+    )
 
 
 def card(channel: Channel) -> rx.Component:
@@ -42,6 +55,7 @@ def card(channel: Channel) -> rx.Component:
                             loading="lazy",
                         ),
                     ),
+                    status_dot(channel.status),
                     position="relative",
                 ),
                 rx.center(
@@ -88,6 +102,7 @@ def card(channel: Channel) -> rx.Component:
                 },
             ),
             position="relative",
+            opacity=rx.cond(channel.status == "down", "0.5", "1"),
         ),
         href=f"/watch/{channel.id}",
     )
@@ -0,0 +1,122 @@
+import sys
+import time
+import asyncio
+import threading
+import traceback
+import tracemalloc
+from collections import Counter, deque
+
+
+def collapse(frame) -> str:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+class Profiler:
+    def __init__(self):
+        self.lock = asyncio.Lock()
+
+    @staticmethod
+    def sample(thread_id: int, seconds: float, interval: float) -> Counter:
+        stacks = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                stacks[collapse(frame)] += 1
+            del frame
+            time.sleep(interval)
+        return stacks
+
+    async def profile(self, seconds: float, interval: float) -> str:
+        thread_id = threading.get_ident()
+        async with self.lock:
+            stacks = await asyncio.to_thread(self.sample, thread_id, seconds, interval)
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+class MemoryTracker:
+    def __init__(self):
+        self.previous = None
+
+    def snapshot(self, limit: int, frames: int) -> dict:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            self.previous = tracemalloc.take_snapshot()
+            return {"tracing": True, "started": True}
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        result = {
+            "tracing": True,
+            "current": current,
+            "peak": peak,
+            "top": [{"trace": str(stat.traceback), "size": stat.size, "count": stat.count} for stat in snapshot.statistics("lineno")[:limit]],
+        }
+        if self.previous is not None:
+            result["diff"] = [
+                {"trace": str(stat.traceback), "size_diff": stat.size_diff, "count_diff": stat.count_diff}
+                for stat in snapshot.compare_to(self.previous, "lineno")[:limit]
+            ]
+        self.previous = snapshot
+        return result
+
+    def stop(self) -> dict:
+        tracemalloc.stop()
+        self.previous = None
+        return {"tracing": False}
+
+
+class LoopMonitor:
+    def __init__(self, threshold: float, interval: float = 0.1):
+        self.threshold = threshold
+        self.interval = interval
+        self.stalls = deque(maxlen=50)
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        self.ticks = 0
+        self._heartbeat = time.monotonic()
+        self._thread_id = None
+
+    def summary(self) -> dict:
+        return {
+            "max_lag_ms": round(self.max_lag * 1000, 3),
+            "avg_lag_ms": round(self.total_lag / self.ticks * 1000, 3) if self.ticks else 0.0,
+            "stalls": len(self.stalls),
+        }
+
+    def _watchdog(self, stop: threading.Event):
+        reported = None
+        while not stop.wait(self.threshold / 2):
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat
+            if blocked > self.threshold and reported != heartbeat:
+                reported = heartbeat
+                frame = sys._current_frames().get(self._thread_id)
+                stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+                del frame
+                self.stalls.append({"time": time.time(), "blocked_ms": round(blocked * 1000, 3), "stack": stack})
+                print(f"Event loop blocked for at least {blocked * 1000:.0f} ms:\n{stack}")
+
+    async def run(self):
+        self._thread_id = threading.get_ident()
+        stop = threading.Event()
+        watchdog = threading.Thread(target=self._watchdog, args=(stop,), name="loop-watchdog", daemon=True)
+        watchdog.start()
+        try:
+            while True:
+                start = time.monotonic()
+                self._heartbeat = start
+                await asyncio.sleep(self.interval)
+                lag = max(time.monotonic() - start - self.interval, 0.0)
+                self.max_lag = max(self.max_lag, lag)
+                self.total_lag += lag
+                self.ticks += 1
+        finally:
+            stop.set()
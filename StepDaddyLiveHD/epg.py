@@ -0,0 +1,101 @@
+import zlib
+import secrets
+from datetime import datetime, timedelta
+from xml.sax.saxutils import escape, quoteattr
+
+header = b'<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE tv SYSTEM "xmltv.dtd">\n<tv generator-info-name="StepDaddyLiveHD">\n'
+footer = b"</tv>\n"
+default_duration = timedelta(hours=2)
+
+
+def xmltv_time(dt: datetime) -> str:
+    return dt.strftime("%Y%m%d%H%M%S %z")
+
+
+def render_channel(channel) -> bytes:
+    icon = f"<icon src={quoteattr(channel.logo)}/>" if channel.logo else ""
+    return f"<channel id={quoteattr(channel.id)}><display-name>{escape(channel.name)}</display-name>{icon}</channel>\n".encode()
+
+
+def render_programmes(channel_id: str, events: list) -> bytes:
+    data = ""
+    for i, event in enumerate(events):
+        start = event["dt"]
+        stop = start + default_duration
+        if i + 1 < len(events) and start < events[i + 1]["dt"] < stop:
+            stop = events[i + 1]["dt"]
+        data += (
+            f"<programme start=\"{xmltv_time(start)}\" stop=\"{xmltv_time(stop)}\" channel={quoteattr(channel_id)}>"
+            f"<title>{escape(event['name'])}</title><category>{escape(event['category'])}</category></programme>\n"
+        )
+    return data.encode()
+
+
+class EpgDocument:
+    __slots__ = ("etag", "chunks", "gzip_chunks")
+
+    def __init__(self, etag: str, chunks: list[bytes], gzip_chunks: list[bytes]):
+        self.etag = etag
+        self.chunks = chunks
+        self.gzip_chunks = gzip_chunks
+
+    def stream(self, encoding: str):
+        chunks = self.gzip_chunks if encoding == "gzip" else self.chunks
+        buffer = b""
+        for chunk in chunks:
+            buffer += chunk
+            if len(buffer) >= 64 * 1024:
+                yield buffer
+                buffer = b""
+        if buffer:
+            yield buffer
+
+
+class EpgBuilder:
+    def __init__(self):
+        self.version = None
+        self.document = EpgDocument("", [], [])
+        self._instance = secrets.token_hex(4)
+        self._channels = {}
+        self._programmes = {}
+
+    def update(self, channels: list, channels_version: int, events: list, schedule_version: int):
+        version = (channels_version, schedule_version)
+        if version == self.version:
+            return
+        by_channel = {}
+        for event in events:
+            for channel in event["channels"]:
+                by_channel.setdefault(channel["id"], []).append(event)
+
+        channel_chunks = []
+        programme_chunks = []
+        fragments = {}
+        programmes = {}
+        for channel in channels:
+            signature = (channel.name, channel.logo)
+            cached = self._channels.get(channel.id)
+            fragments[channel.id] = cached if cached and cached[0] == signature else (signature, render_channel(channel))
+            channel_chunks.append(fragments[channel.id][1])
+
+            channel_events = by_channel.get(channel.id)
+            if channel_events:
+                signature = tuple((event["name"], event["dt"], event["category"]) for event in channel_events)
+                cached = self._programmes.get(channel.id)
+                programmes[channel.id] = cached if cached and cached[0] == signature else (signature, render_programmes(channel.id, channel_events))
+                programme_chunks.append(programmes[channel.id][1])
+
+        chunks = [header, *channel_chunks, *programme_chunks, footer]
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        gzip_chunks = []
+        pending = b""
+        for chunk in chunks:
+            pending += compressor.compress(chunk)
+            if len(pending) >= 64 * 1024:
+                gzip_chunks.append(pending)
+                pending = b""
+        gzip_chunks.append(pending + compressor.flush())
+        self._channels = fragments
+        self._programmes = programmes
+        self.document = EpgDocument(f'"epg-{self._instance}-{channels_version}-{schedule_version}"', chunks, gzip_chunks)
+        self.version = version
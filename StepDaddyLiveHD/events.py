@@ -0,0 +1,116 @@
+import re
+import heapq
+from bisect import bisect_left, bisect_right
+from typing import List, TypedDict
+from zoneinfo import ZoneInfo
+from datetime import datetime
+from dateutil import parser
+
+
+class ChannelItem(TypedDict):
+    name: str
+    id: str
+
+
+class EventItem(TypedDict):
+    name: str
+    time: str
+    dt: datetime
+    category: str
+    channels: List[ChannelItem]
+
+
+def get_channels(channels: dict) -> List[ChannelItem]:
+    channel_list = []
+    if isinstance(channels, list):
+        for channel in channels:
+            try:
+                channel_list.append(ChannelItem(name=channel["channel_name"], id=channel["channel_id"]))
+            except:
+                continue
+    elif isinstance(channels, dict):
+        for channel_dic in channels:
+            try:
+                channel_list.append(ChannelItem(name=channels[channel_dic]["channel_name"], id=channels[channel_dic]["channel_id"]))
+            except:
+                continue
+    return channel_list
+
+
+def parse_schedule(days: dict) -> tuple[List[EventItem], List[str]]:
+    events = []
+    categories = set()
+    for day in days:
+        name = day.split(" - ")[0]
+        dt = parser.parse(name, dayfirst=True)
+        for category in days[day]:
+            categories.add(category)
+            for event in days[day][category]:
+                time = event["time"]
+                hour, minute = map(int, time.split(":"))
+                event_dt = dt.replace(hour=hour, minute=minute).replace(tzinfo=ZoneInfo("UTC"))
+                channels = get_channels(event.get("channels"))
+                channels.extend(get_channels(event.get("channels2")))
+                channels.sort(key=lambda channel: channel["name"])
+                events.append(EventItem(name=event["event"], time=time, dt=event_dt, category=category, channels=channels))
+    events.sort(key=lambda event: event["dt"])
+    return events, sorted(categories)
+
+
+def event_channels(events: List[EventItem], start: datetime, end: datetime) -> set[str]:
+    return {channel["id"] for event in events if start <= event["dt"] <= end for channel in event["channels"]}
+
+
+class ScheduleIndex:
+    def __init__(self, events: List[EventItem], categories: List[str]):
+        self.events = events
+        self.categories = categories
+        self.times = [event["dt"] for event in events]
+        self.names = [event["name"].lower() for event in events]
+        self.buckets: dict[str, list[int]] = {category: [] for category in categories}
+        self.tokens: dict[str, list[int]] = {}
+        for position, event in enumerate(events):
+            self.buckets.setdefault(event["category"], []).append(position)
+            for token in set(re.findall(r"\w+", self.names[position])):
+                self.tokens.setdefault(token, []).append(position)
+        self._matches: dict[str, set[int]] = {}
+
+    def _token_matches(self, fragment: str) -> set[int]:
+        matches = self._matches.get(fragment)
+        if matches is None:
+            matches = set()
+            for token, positions in self.tokens.items():
+                if fragment in token:
+                    matches.update(positions)
+            if len(self._matches) > 1024:
+                self._matches.clear()
+            self._matches[fragment] = matches
+        return matches
+
+    def _positions(self, categories: set[str] | None, start: int, end: int):
+        if categories is None or len(categories) >= len(self.buckets) and categories.issuperset(self.buckets):
+            return range(start, end)
+        buckets = [self.buckets[category] for category in categories if category in self.buckets]
+        return heapq.merge(*(bucket[bisect_left(bucket, start):bisect_left(bucket, end)] for bucket in buckets))
+
+    def query(self, categories: set[str] | None = None, after: datetime | None = None, search: str = "", offset: int = 0, limit: int | None = None, before: datetime | None = None, since: datetime | None = None) -> tuple[List[EventItem], int]:
+        if since is not None:
+            start = bisect_left(self.times, since)
+        else:
+            start = bisect_right(self.times, after) if after is not None else 0
+        end = bisect_right(self.times, before) if before is not None else len(self.events)
+        positions = self._positions(categories, start, end)
+        search = search.strip().lower()
+        if search:
+            candidates = None
+            for fragment in re.findall(r"\w+", search):
+                matches = self._token_matches(fragment)
+                candidates = matches if candidates is None else candidates & matches
+            positions = [
+                position for position in positions
+                if (candidates is None or position in candidates) and search in self.names[position]
+            ]
+        else:
+            positions = list(positions)
+        end = None if limit is None else offset + limit
+        return [self.events[position] for position in positions[offset:end]], len(positions)
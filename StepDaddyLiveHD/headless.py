@@ -0,0 +1,20 @@
+import asyncio
+from contextlib import asynccontextmanager
+from StepDaddyLiveHD import backend
+
+background_tasks = (backend.run_jobs, backend.monitor_loop)
+
+
+@asynccontextmanager
+async def lifespan(_):
+    tasks = [asyncio.create_task(task()) for task in background_tasks]
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.wait(tasks, timeout=5)
+
+
+backend.fastapi_app.router.lifespan_context = lifespan
+app = backend.fastapi_app
@@ -0,0 +1,152 @@
+import time
+import asyncio
+from collections import Counter, deque
+
+
+class ChannelHealth:
+    __slots__ = ("up", "latency", "last_seen", "last_checked", "failures")
+
+    def __init__(self):
+        self.up = False
+        self.latency = 0.0
+        self.last_seen = 0.0
+        self.last_checked = 0.0
+        self.failures = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "up": self.up,
+            "latency": round(self.latency, 3),
+            "last_seen": self.last_seen,
+            "last_checked": self.last_checked,
+            "failures": self.failures,
+        }
+
+
+class HealthProber:
+    def __init__(self, step_daddy, concurrency: int, interval: float):
+        self._step_daddy = step_daddy
+        self.concurrency = concurrency
+        self.interval = interval
+        self.index: dict[str, ChannelHealth] = {}
+        self.popularity = Counter()
+        self.last_hit: dict[str, float] = {}
+        self.scheduled: set[str] = set()
+        self.version = 0
+        self._statuses = ({}, -1)
+        self._changes = deque(maxlen=256)
+        self._in_flight: set[str] = set()
+        self._known = (set(), None)
+        self._tasks = set()
+        self._semaphore = None
+        self._last_decay = time.time()
+
+    def known(self, channel_id: str) -> bool:
+        known, channels = self._known
+        if channels is not self._step_daddy.channels:
+            channels = self._step_daddy.channels
+            known = {channel.id for channel in channels}
+            self._known = (known, channels)
+        return channel_id in known
+
+    def hit(self, channel_id: str):
+        if self.known(channel_id):
+            self.popularity[channel_id] += 1
+            self.last_hit[channel_id] = time.time()
+
+    def watched(self, channel_id: str, window: float = 120) -> bool:
+        return time.time() - self.last_hit.get(channel_id, 0) < window
+
+    def observe(self, channel_id: str, up: bool, latency: float):
+        if self.known(channel_id):
+            self.record(channel_id, up, latency)
+
+    def record(self, channel_id: str, up: bool, latency: float):
+        health = self.index.get(channel_id)
+        if health is None:
+            health = self.index[channel_id] = ChannelHealth()
+        now = time.time()
+        if health.up != up or health.last_checked == 0:
+            self.version += 1
+            self._changes.append((self.version, channel_id))
+        health.up = up
+        health.latency = latency
+        health.last_checked = now
+        if up:
+            health.last_seen = now
+            health.failures = 0
+        else:
+            health.failures += 1
+
+    def statuses(self) -> dict[str, str]:
+        statuses, version = self._statuses
+        if version != self.version:
+            statuses = {channel_id: "up" if health.up else "down" for channel_id, health in self.index.items()}
+            self._statuses = (statuses, self.version)
+        return statuses
+
+    def changes_since(self, version: int) -> set[str] | None:
+        if version == self.version:
+            return set()
+        if not self._changes or version < self._changes[0][0] - 1 or version > self.version:
+            return None
+        return {channel_id for change_version, channel_id in self._changes if change_version > version}
+
+    def summary(self) -> dict:
+        up = sum(1 for health in self.index.values() if health.up)
+        return {"probed": len(self.index), "up": up, "down": len(self.index) - up, "scheduled": len(self.scheduled)}
+
+    def period(self, channel_id: str) -> float:
+        if channel_id in self.scheduled:
+            return min(self.interval, 300)
+        hits = self.popularity.get(channel_id, 0)
+        if hits:
+            return max(self.interval / (1 + hits) ** 0.5, 120)
+        return self.interval
+
+    def due(self, now: float) -> list[str]:
+        due = []
+        for channel in self._step_daddy.channels:
+            if channel.id in self._in_flight:
+                continue
+            health = self.index.get(channel.id)
+            last_checked = health.last_checked if health else 0
+            overdue = now - last_checked - self.period(channel.id)
+            if overdue >= 0:
+                due.append((overdue, channel.id))
+        due.sort(reverse=True)
+        return [channel_id for _, channel_id in due]
+
+    async def probe(self, channel_id: str):
+        start = time.perf_counter()
+        try:
+            playlist = await self._step_daddy.stream(channel_id)
+            up = "#EXTINF" in playlist
+        except Exception:
+            up = False
+        self.record(channel_id, up, time.perf_counter() - start)
+
+    async def tick(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        now = time.time()
+        for channel_id in self.due(now)[:self.concurrency * 4 - len(self._tasks)]:
+            self._in_flight.add(channel_id)
+            task = asyncio.create_task(self._bounded(channel_id))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        if now - self._last_decay > self.interval:
+            self.popularity = Counter({k: v // 2 for k, v in self.popularity.items() if v > 1})
+            self.last_hit = {k: v for k, v in self.last_hit.items() if now - v < self.interval}
+            self._last_decay = now
+
+    async def _bounded(self, channel_id: str):
+        try:
+            async with self._semaphore:
+                await self.probe(channel_id)
+        finally:
+            self._in_flight.discard(channel_id)
+
+    def cancel(self):
+        for task in list(self._tasks):
+            task.cancel()
@@ -0,0 +1,69 @@
+playlist_tags = (
+    "#EXTM3U", "#EXT-X-VERSION:", "#EXT-X-TARGETDURATION:", "#EXT-X-MEDIA-SEQUENCE:", "#EXT-X-DISCONTINUITY-SEQUENCE:",
+    "#EXT-X-PLAYLIST-TYPE:", "#EXT-X-INDEPENDENT-SEGMENTS", "#EXT-X-START:", "#EXT-X-SERVER-CONTROL:", "#EXT-X-PART-INF:",
+    "#EXT-X-ALLOW-CACHE:", "#EXT-X-I-FRAMES-ONLY",
+)
+
+
+def parse(m3u8: str) -> tuple[list[str], list[list[str]], list[str]]:
+    header = []
+    segments = []
+    pending = []
+    for line in m3u8.splitlines():
+        if not line.strip():
+            continue
+        if not line.startswith("#"):
+            segments.append(pending + [line])
+            pending = []
+        elif not segments and not pending and line.startswith(playlist_tags):
+            header.append(line)
+        else:
+            pending.append(line)
+    return header, segments, pending
+
+
+def tag_value(lines: list[str], tag: str) -> str | None:
+    for line in lines:
+        if line.startswith(tag):
+            return line[len(tag):]
+    return None
+
+
+def last_sequence(m3u8: str) -> int:
+    header, segments, _ = parse(m3u8)
+    return int(tag_value(header, "#EXT-X-MEDIA-SEQUENCE:") or 0) + len(segments) - 1
+
+
+def trim(m3u8: str, count: int) -> str:
+    header, segments, footer = parse(m3u8)
+    if count <= 0 or not segments:
+        return m3u8
+    dropped, kept = segments[:-count], segments[-count:]
+
+    key = None
+    discontinuities = 0
+    for segment in dropped:
+        for line in segment:
+            if line.startswith("#EXT-X-KEY:"):
+                key = line
+            elif line.startswith("#EXT-X-DISCONTINUITY"):
+                discontinuities += 1
+    if key and not any(line.startswith("#EXT-X-KEY:") for line in kept[0]):
+        kept[0] = [key] + kept[0]
+
+    target = int(tag_value(header, "#EXT-X-TARGETDURATION:") or 6)
+    lines = []
+    for line in header:
+        if line.startswith("#EXT-X-MEDIA-SEQUENCE:"):
+            line = f"#EXT-X-MEDIA-SEQUENCE:{int(line.split(':', 1)[1]) + len(dropped)}"
+        elif line.startswith("#EXT-X-DISCONTINUITY-SEQUENCE:"):
+            line = f"#EXT-X-DISCONTINUITY-SEQUENCE:{int(line.split(':', 1)[1]) + discontinuities}"
+        elif line.startswith(("#EXT-X-START:", "#EXT-X-SERVER-CONTROL:")):
+            continue
+        lines.append(line)
+    lines.append(f"#EXT-X-START:TIME-OFFSET=-{min(count, 3) * target},PRECISE=NO")
+    lines.append("#EXT-X-SERVER-CONTROL:CAN-BLOCK-RELOAD=YES")
+    for segment in kept:
+        lines.extend(segment)
+    lines.extend(footer)
+    return "\n".join(lines) + "\n"
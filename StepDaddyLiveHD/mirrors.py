@@ -0,0 +1,77 @@
+import time
+import asyncio
+
+
+class MirrorError(Exception):
+    pass
+
+
+class Mirror:
+    __slots__ = ("url", "healthy", "latency", "requests", "failures", "last_checked", "last_error")
+
+    def __init__(self, url: str):
+        self.url = url
+        self.healthy = True
+        self.latency = None
+        self.requests = 0
+        self.failures = 0
+        self.last_checked = 0.0
+        self.last_error = ""
+
+    def as_dict(self) -> dict:
+        return {
+            "healthy": self.healthy,
+            "latency": round(self.latency, 3) if self.latency is not None else None,
+            "requests": self.requests,
+            "failures": self.failures,
+            "last_checked": self.last_checked,
+            "last_error": self.last_error,
+        }
+
+
+class MirrorPool:
+    def __init__(self, urls: list[str]):
+        if not urls:
+            raise ValueError("At least one mirror is required")
+        self.mirrors = [Mirror(url.rstrip("/")) for url in urls]
+
+    def ordered(self) -> list[Mirror]:
+        return sorted(self.mirrors, key=lambda mirror: (not mirror.healthy, mirror.latency is None, mirror.latency or 0.0))
+
+    def best(self) -> Mirror:
+        return self.ordered()[0]
+
+    def record(self, mirror: Mirror, ok: bool, latency: float, error: str = ""):
+        mirror.requests += 1
+        mirror.last_checked = time.time()
+        mirror.healthy = ok
+        if ok:
+            mirror.latency = latency if mirror.latency is None else mirror.latency * 0.7 + latency * 0.3
+        else:
+            mirror.failures += 1
+            mirror.last_error = error
+
+    async def _attempt(self, mirror: Mirror, fetch):
+        start = time.perf_counter()
+        try:
+            result = await fetch(mirror.url)
+        except MirrorError as e:
+            self.record(mirror, False, time.perf_counter() - start, str(e))
+            raise
+        self.record(mirror, True, time.perf_counter() - start)
+        return result
+
+    async def request(self, fetch):
+        error = None
+        for mirror in self.ordered():
+            try:
+                return await self._attempt(mirror, fetch)
+            except MirrorError as e:
+                error = e
+        raise error
+
+    async def probe(self, fetch):
+        await asyncio.gather(*(self._attempt(mirror, fetch) for mirror in self.mirrors), return_exceptions=True)
+
+    def summary(self) -> dict:
+        return {mirror.url: mirror.as_dict() for mirror in self.mirrors}
@@ -1,50 +1,31 @@
 import reflex as rx
-from typing import Dict, List, TypedDict
+from typing import Dict, List
 from zoneinfo import ZoneInfo
 from datetime import datetime, timedelta
-from dateutil import parser
 from StepDaddyLiveHD import backend
 from StepDaddyLiveHD.components import navbar
-
-
-class ChannelItem(TypedDict):
-    name: str
-    id: str
-
-
-class EventItem(TypedDict):
-    name: str
-    time: str
-    dt: datetime
-    category: str
-    channels: List[ChannelItem]
+from StepDaddyLiveHD.events import EventItem
 
 
 class ScheduleState(rx.State):
     events: List[EventItem] = []
+    total: int = 0
+    limit: int = 50
     categories: Dict[str, bool] = {}
+    statuses: Dict[str, str] = {}
     switch: bool = True
     search_query: str = ""
 
-    @staticmethod
-    def get_channels(channels: dict) -> List[ChannelItem]:
-        channel_list = []
-        if isinstance(channels, list):
-            for channel in channels:
-                try:
-                    channel_list.append(ChannelItem(name=channel["channel_name"], id=channel["channel_id"]))
-                except:
-                    continue
-        elif isinstance(channels, dict):
-            for channel_dic in channels:
-                try:
-                    channel_list.append(ChannelItem(name=channels[channel_dic]["channel_name"], id=channels[channel_dic]["channel_id"]))
-                except:
-                    continue
-        return channel_list
+    def _apply_filters(self):
+        after = datetime.now(ZoneInfo("UTC")) - timedelta(minutes=30) if self.switch else None
+        categories = {category for category, enabled in self.categories.items() if enabled}
+        self.events, self.total = backend.schedule_index().query(categories, after, self.search_query, 0, self.limit)
+        statuses = backend.get_channel_statuses()
+        self.statuses = {channel["id"]: statuses[channel["id"]] for event in self.events for channel in event["channels"] if channel["id"] in statuses}
 
     def toggle_category(self, category):
         self.categories[category] = not self.categories.get(category, False)
+        self._apply_filters()
 
     def double_category(self, category):
         for cat in self.categories:
@@ -52,46 +33,29 @@ class ScheduleState(rx.State):
                 self.categories[cat] = False
             else:
                 self.categories[cat] = True
+        self._apply_filters()
 
     async def on_load(self):
-        self.events = []
-        categories = {}
-        days = await backend.get_schedule()
-        for day in days:
-            name = day.split(" - ")[0]
-            dt = parser.parse(name, dayfirst=True)
-            for category in days[day]:
-                categories[category] = True
-                for event in days[day][category]:
-                    time = event["time"]
-                    hour, minute = map(int, time.split(":"))
-                    event_dt = dt.replace(hour=hour, minute=minute).replace(tzinfo=ZoneInfo("UTC"))
-                    channels = self.get_channels(event.get("channels"))
-                    channels.extend(self.get_channels(event.get("channels2")))
-                    channels.sort(key=lambda channel: channel["name"])
-                    self.events.append(EventItem(name=event["event"], time=time, dt=event_dt, category=category, channels=channels))
-        self.categories = dict(sorted(categories.items()))
-        self.events.sort(key=lambda event: event["dt"])
+        index = await backend.get_schedule_index()
+        self.categories = {category: True for category in index.categories}
+        self.limit = 50
+        self._apply_filters()
 
     @rx.event
     def set_switch(self, value: bool):
         self.switch = value
+        self._apply_filters()
 
     @rx.event
     def set_search_query(self, value: str):
         self.search_query = value
+        self.limit = 50
+        self._apply_filters()
 
-    @rx.var
-    def filtered_events(self) -> List[EventItem]:
-        now = datetime.now(ZoneInfo("UTC")) - timedelta(minutes=30)
-        query = self.search_query.strip().lower()
-
-        return [
-            event for event in self.events
-            if self.categories.get(event["category"], False)
-               and (not self.switch or event["dt"] > now)
-               and (query == "" or query in event["name"].lower())
-        ]
+    @rx.event
+    def load_more(self):
+        self.limit += 50
+        self._apply_filters()
 
 
 def event_card(event: EventItem) -> rx.Component:
@@ -105,7 +69,13 @@ def event_card(event: EventItem) -> rx.Component:
         rx.hstack(
             rx.foreach(
                 event["channels"],
-                lambda channel: rx.button(channel["name"], variant="surface", color_scheme="gray", size="1", on_click=rx.redirect(f"/watch/{channel['id']}")),
+                lambda channel: rx.button(
+                    channel["name"],
+                    variant="surface",
+                    color_scheme=rx.match(ScheduleState.statuses[channel["id"]], ("up", "green"), ("down", "red"), "gray"),
+                    size="1",
+                    on_click=rx.redirect(f"/watch/{channel['id']}"),
+                ),
             ),
             wrap="wrap",
             margin_top="0.5rem",
@@ -166,7 +136,12 @@ def schedule() -> rx.Component:
                         ),
                         rx.spinner(size="3"),
                     ),
-                    rx.foreach(ScheduleState.filtered_events, event_card),
+                    rx.foreach(ScheduleState.events, event_card),
+                    rx.cond(
+                        ScheduleState.total > ScheduleState.events.length(),
+                        rx.button("Show more", variant="surface", color_scheme="gray", on_click=ScheduleState.load_more, width="100%"),
+                        rx.fragment(),
+                    ),
                 ),
             ),
             padding_top="10rem",
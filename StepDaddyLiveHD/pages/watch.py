@@ -1,8 +1,7 @@
 import reflex as rx
 from rxconfig import config
-from StepDaddyLiveHD import backend
+from StepDaddyLiveHD.channels import Channel, get_channel
 from StepDaddyLiveHD.components import navbar, MediaPlayer
-from StepDaddyLiveHD.step_daddy import Channel
 
 media_player = MediaPlayer.create
 
@@ -13,7 +12,7 @@ class WatchState(rx.State):
     @rx.var
     def channel(self) -> Channel | None:
         self.is_loaded = False
-        channel = backend.get_channel(str(self.channel_id))
+        channel = get_channel(str(self.channel_id))
         self.is_loaded = True
         return channel
 
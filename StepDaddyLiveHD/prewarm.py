@@ -0,0 +1,35 @@
+import asyncio
+from zoneinfo import ZoneInfo
+from datetime import datetime, timedelta
+from .events import event_channels
+
+
+class Prewarmer:
+    def __init__(self, step_daddy, lead: timedelta, live: timedelta, watched, concurrency: int = 4):
+        self._step_daddy = step_daddy
+        self._watched = watched
+        self.lead = lead
+        self.live = live
+        self.concurrency = concurrency
+        self.targets: set[str] = set()
+        self.stats = {"warmed": 0, "failed": 0}
+
+    async def warm(self, channel_id: str, semaphore: asyncio.Semaphore):
+        async with semaphore:
+            try:
+                await self._step_daddy.warm(channel_id)
+                self.stats["warmed"] += 1
+            except Exception:
+                self.stats["failed"] += 1
+
+    async def tick(self, get_events):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        try:
+            events, _ = await get_events()
+        except Exception:
+            events = []
+        now = datetime.now(ZoneInfo("UTC"))
+        upcoming = event_channels(events, now, now + self.lead)
+        live = {channel_id for channel_id in event_channels(events, now - self.live, now) if self._watched(channel_id)}
+        self.targets = upcoming | live
+        await asyncio.gather(*(self.warm(channel_id, semaphore) for channel_id in self.targets))
@@ -0,0 +1,92 @@
+import gzip
+import hashlib
+from collections import OrderedDict
+from fastapi import Request, Response, status
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class Rendered:
+    __slots__ = ("body", "etag", "media_type", "_encoded")
+
+    def __init__(self, body: bytes, media_type: str):
+        self.body = body
+        self.etag = f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+        self.media_type = media_type
+        self._encoded = {}
+
+    def encoded(self, encoding: str) -> bytes:
+        if encoding == "identity":
+            return self.body
+        body = self._encoded.get(encoding)
+        if body is None:
+            if encoding == "br":
+                body = brotli.compress(self.body, quality=5)
+            else:
+                body = gzip.compress(self.body, compresslevel=6)
+            self._encoded[encoding] = body
+        return body
+
+
+class RenderCache:
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, key, render, media_type: str) -> Rendered:
+        rendered = self._entries.get(key)
+        if rendered is None:
+            rendered = Rendered(render(), media_type)
+            self._entries[key] = rendered
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(key)
+        return rendered
+
+    def clear(self):
+        self._entries.clear()
+
+
+def accepted_encoding(request: Request, available: tuple[str, ...] = ("br", "gzip")) -> str:
+    accepted = set()
+    for part in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(name.strip().lower())
+    if brotli is not None and "br" in accepted and "br" in available:
+        return "br"
+    if "gzip" in accepted and "gzip" in available:
+        return "gzip"
+    return "identity"
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    if encoding == "identity":
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match", "")
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")) or if_none_match.strip() == "*"
+
+
+def cached_response(request: Request, rendered: Rendered, headers: dict | None = None, max_age: int = 0) -> Response:
+    encoding = accepted_encoding(request)
+    etag = encoded_etag(rendered.etag, encoding)
+    response_headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={max_age}" if max_age else "no-cache",
+        "Vary": "Accept-Encoding",
+        **(headers or {}),
+    }
+    if not_modified(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=response_headers)
+    if encoding != "identity":
+        response_headers["Content-Encoding"] = encoding
+    return Response(content=rendered.encoded(encoding), media_type=rendered.media_type, headers=response_headers)
@@ -0,0 +1,140 @@
+import os
+import time
+import shutil
+import asyncio
+import uuid
+import hashlib
+from collections import Counter, OrderedDict
+
+
+class Segment:
+    __slots__ = ("channel", "path", "size", "created")
+
+    def __init__(self, channel: str, path: str, size: int, created: float):
+        self.channel = channel
+        self.path = path
+        self.size = size
+        self.created = created
+
+
+class SegmentCache:
+    def __init__(self, root: str, total_bytes: int, channel_bytes: int, max_age: float):
+        self.root = os.path.join(root, str(os.getpid()))
+        self.total_bytes = total_bytes
+        self.channel_bytes = channel_bytes
+        self.max_age = max_age
+        self.size = 0
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "errors": 0}
+        self._segments = OrderedDict()
+        self._channel_sizes = Counter()
+        self._viewers = {}
+        self._writing = set()
+        if self.enabled:
+            self._remove_stale(root)
+            shutil.rmtree(self.root, ignore_errors=True)
+            os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def _remove_stale(root: str):
+        if not os.path.isdir(root):
+            return
+        for name in os.listdir(root):
+            if not name.isdigit() or int(name) == os.getpid():
+                continue
+            try:
+                os.kill(int(name), 0)
+            except ProcessLookupError:
+                shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+            except OSError:
+                pass
+
+    @property
+    def enabled(self) -> bool:
+        return self.total_bytes > 0
+
+    @staticmethod
+    def key(url: str) -> str:
+        return hashlib.blake2b(url.encode(), digest_size=16).hexdigest()
+
+    def seen(self, channel: str, client: str, min_viewers: int) -> bool:
+        now = time.monotonic()
+        viewers = self._viewers.setdefault(channel, {})
+        viewers[client] = now
+        if len(viewers) >= min_viewers:
+            for viewer, last_seen in list(viewers.items()):
+                if now - last_seen > 60:
+                    del viewers[viewer]
+        return len(viewers) >= min_viewers
+
+    def get(self, url: str) -> str | None:
+        segment = self._segments.get(self.key(url))
+        if segment is None or time.monotonic() - segment.created > self.max_age:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return segment.path
+
+    async def put(self, url: str, channel: str, data: bytes):
+        key = self.key(url)
+        if key in self._segments or key in self._writing or len(data) > self.channel_bytes:
+            return
+        path = os.path.join(self.root, f"{key}.ts")
+        self._writing.add(key)
+        try:
+            await asyncio.to_thread(self._write, path, data)
+        except OSError as e:
+            self.stats["errors"] += 1
+            print(f"Failed to cache segment {path}: {e}")
+            return
+        finally:
+            self._writing.discard(key)
+        self._segments[key] = Segment(channel, path, len(data), time.monotonic())
+        self._channel_sizes[channel] += len(data)
+        self.size += len(data)
+        self.stats["stores"] += 1
+        self.sweep(channel)
+
+    @staticmethod
+    def _write(path: str, data: bytes):
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    def _evict(self, key: str):
+        segment = self._segments.pop(key)
+        self._channel_sizes[segment.channel] -= segment.size
+        if self._channel_sizes[segment.channel] <= 0:
+            del self._channel_sizes[segment.channel]
+        self.size -= segment.size
+        self.stats["evictions"] += 1
+        try:
+            os.remove(segment.path)
+        except OSError:
+            pass
+
+    def sweep(self, channel: str | None = None):
+        now = time.monotonic()
+        while self._segments:
+            key, segment = next(iter(self._segments.items()))
+            if now - segment.created <= self.max_age and self.size <= self.total_bytes:
+                break
+            self._evict(key)
+        if channel is not None and self._channel_sizes[channel] > self.channel_bytes:
+            for key in [k for k, s in self._segments.items() if s.channel == channel]:
+                if self._channel_sizes[channel] <= self.channel_bytes:
+                    break
+                self._evict(key)
+        for channel, viewers in list(self._viewers.items()):
+            if all(now - last_seen > 60 for last_seen in viewers.values()):
+                del self._viewers[channel]
+
+    def summary(self) -> dict:
+        return {**self.stats, "segments": len(self._segments), "bytes": self.size, "channels": len(self._channel_sizes)}
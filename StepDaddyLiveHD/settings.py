@@ -0,0 +1,42 @@
+import os
+
+
+class Settings:
+    def __init__(self):
+        self.api_url = os.environ.get("REFLEX_API_URL") or os.environ.get("API_URL") or "http://localhost:8000"
+        self.mirrors = [url.strip() for url in os.environ.get("MIRRORS", "https://dlhd.dad").split(",") if url.strip()]
+        self.mirror_probe_interval = int(os.environ.get("MIRROR_PROBE_INTERVAL", "300"))
+        self.proxy_content = os.environ.get("PROXY_CONTENT", "TRUE").upper() == "TRUE"
+        self.socks5 = os.environ.get("SOCKS5", "")
+        self.tracing = os.environ.get("TRACING", "FALSE").upper() == "TRUE"
+        self.probe_concurrency = int(os.environ.get("PROBE_CONCURRENCY", "2"))
+        self.probe_interval = int(os.environ.get("PROBE_INTERVAL", "3600"))
+        self.prewarm_lead = int(os.environ.get("PREWARM_LEAD", "5"))
+        self.low_latency_segments = int(os.environ.get("LOW_LATENCY_SEGMENTS", "0"))
+        self.segment_cache_size = int(os.environ.get("SEGMENT_CACHE_SIZE", "0"))
+        self.segment_cache_channel_size = int(os.environ.get("SEGMENT_CACHE_CHANNEL_SIZE", "64"))
+        self.segment_cache_max_age = int(os.environ.get("SEGMENT_CACHE_MAX_AGE", "120"))
+        self.segment_cache_min_viewers = 2
+        self.accel_redirect = os.environ.get("ACCEL_REDIRECT", "FALSE").upper() == "TRUE"
+        self.egress_limit = float(os.environ.get("EGRESS_LIMIT", "0"))
+        self.client_rate_limit = float(os.environ.get("CLIENT_RATE_LIMIT", "0"))
+        self.batch_limit = 16
+        self.batch_concurrency = 4
+        self.debug_token = os.environ.get("DEBUG_TOKEN", "")
+        self.loop_lag_threshold = int(os.environ.get("LOOP_LAG_THRESHOLD", "250"))
+        self.resolve_ttl = 180
+        self.key_ttl = 600
+        self.schedule_ttl = 300
+
+    def app_settings(self) -> dict:
+        return {key: value for key, value in vars(self).items() if key not in ("api_url", "debug_token")}
+
+
+config = Settings()
+
+print(
+    f"MIRRORS: {', '.join(config.mirrors)}\nPROXY_CONTENT: {config.proxy_content}\nSOCKS5: {config.socks5}\nTRACING: {config.tracing}\n"
+    f"PROBE_CONCURRENCY: {config.probe_concurrency}\nPREWARM_LEAD: {config.prewarm_lead}\n"
+    f"LOW_LATENCY_SEGMENTS: {config.low_latency_segments}\nSEGMENT_CACHE_SIZE: {config.segment_cache_size}\n"
+    f"EGRESS_LIMIT: {config.egress_limit}\nCLIENT_RATE_LIMIT: {config.client_rate_limit}"
+)
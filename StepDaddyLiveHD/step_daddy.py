@@ -1,18 +1,46 @@
-import json
 import re
-import reflex as rx
+import sys
+import json
+import time
+import asyncio
+from collections import deque
 from urllib.parse import quote, urlparse
 from curl_cffi import AsyncSession
-from typing import List
 from .utils import encrypt, decrypt, urlsafe_base64, decode_bundle
-from rxconfig import config
+from .tracing import span
+from .fastjson import loads, decode_daddy
+from . import hls
+from .settings import config
+from .mirrors import MirrorPool, MirrorError
+
+
+class StreamNotFound(Exception):
+    pass
+
+
+class InvalidPlaylistRequest(Exception):
+    pass
+
+
+class ChannelRecord:
+    __slots__ = ("id", "name", "tags", "logo")
+
+    def __init__(self, id: str, name: str, tags: tuple[str, ...], logo: str):
+        self.id = id
+        self.name = name
+        self.tags = tags
+        self.logo = logo
+
+    def __eq__(self, other):
+        if not isinstance(other, ChannelRecord):
+            return NotImplemented
+        return self.id == other.id and self.name == other.name and self.tags == other.tags and self.logo == other.logo
 
+    __hash__ = None
 
-class Channel(rx.Base):
-    id: str
-    name: str
-    tags: List[str]
-    logo: str
+
+def channel_sort_key(channel):
+    return channel.name.startswith("18"), channel.name
 
 
 class StepDaddy:
@@ -22,14 +50,33 @@ class StepDaddy:
             self._session = AsyncSession(proxy="socks5://" + socks5)
         else:
             self._session = AsyncSession()
-        self._base_url = "https://dlhd.dad"
+        self.mirrors = MirrorPool(config.mirrors)
         self.channels = []
+        self.version = 0
+        self.loaded = 0.0
+        self._deltas = deque(maxlen=32)
+        self._updated = asyncio.Event()
+        self._resolved = {}
+        self._in_flight = {}
+        self._live = {}
+        self._keys = {}
         with open("StepDaddyLiveHD/meta.json", "r") as f:
-            self._meta = json.load(f)
+            self._meta = self._compact_meta(json.load(f))
+
+    @staticmethod
+    def _compact_meta(meta: dict) -> dict[str, tuple[tuple[str, ...], str]]:
+        compact = {}
+        for name, data in meta.items():
+            logo = data.get("logo", "")
+            if logo.startswith("http"):
+                logo = f"{config.api_url}/logo/{urlsafe_base64(logo)}"
+            tags = tuple(sys.intern(tag) for tag in data.get("tags", []))
+            compact[name] = (tags, sys.intern(logo))
+        return compact
 
     def _headers(self, referer: str = None, origin: str = None):
         if referer is None:
-            referer = self._base_url
+            referer = self.mirrors.best().url
         headers = {
             "Referer": referer,
             "user-agent": "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:137.0) Gecko/20100101 Firefox/137.0",
@@ -38,30 +85,100 @@ class StepDaddy:
             headers["Origin"] = origin
         return headers
 
+    async def _get(self, name: str, url: str, **kwargs):
+        with span(name, host=urlparse(url).netloc) as current:
+            response = await self._session.get(url, **kwargs)
+            current.set("status", response.status_code)
+            current.set("bytes", len(response.content))
+            return response
+
+    async def _mirror_get(self, name: str, base_url: str, path: str, per_channel: bool = False):
+        url = f"{base_url}{path}"
+        try:
+            response = await self._get(name, url, headers=self._headers(base_url))
+        except Exception as e:
+            raise MirrorError(f"{name}: {e}") from e
+        if per_channel and response.status_code in (404, 410):
+            raise StreamNotFound(f"{name} returned {response.status_code}")
+        if response.status_code != 200:
+            raise MirrorError(f"{name} returned {response.status_code}")
+        return url, response
+
+    async def _from_mirrors(self, name: str, path: str, per_channel: bool = False):
+        return await self.mirrors.request(lambda base_url: self._mirror_get(name, base_url, path, per_channel))
+
+    async def probe_mirrors(self):
+        await self.mirrors.probe(lambda base_url: self._mirror_get("mirror probe", base_url, "/"))
+
     async def load_channels(self):
         channels = []
+        _, response = await self._from_mirrors("daddy.json", "/daddy.json")
+        no_meta = ((), "")
+        for channel_id, channel_name in decode_daddy(response.content):
+            channel_name = channel_name.replace("#", "")
+            tags, logo = self._meta.get(channel_name, no_meta)
+            channels.append(ChannelRecord(str(channel_id), channel_name, tags, logo))
+        if not channels:
+            raise ValueError("Upstream returned no channels")
+        self._update_channels(sorted(channels, key=channel_sort_key))
+        self.loaded = time.time()
+
+    def _update_channels(self, channels: list):
+        previous = {channel.id: channel for channel in self.channels}
+        current = {channel.id: channel for channel in channels}
+        delta = {
+            "added": [channel for channel_id, channel in current.items() if channel_id not in previous],
+            "removed": [channel_id for channel_id in previous if channel_id not in current],
+            "changed": [channel for channel_id, channel in current.items() if channel_id in previous and previous[channel_id] != channel],
+        }
+        self.channels = channels
+        if delta["added"] or delta["removed"] or delta["changed"]:
+            self.version += 1
+            self._deltas.append((self.version, delta))
+            updated, self._updated = self._updated, asyncio.Event()
+            updated.set()
+
+    def changes_since(self, version: int) -> list[dict] | None:
+        if version == self.version:
+            return []
+        if not self._deltas or version < self._deltas[0][0] - 1 or version > self.version:
+            return None
+        return [delta for delta_version, delta in self._deltas if delta_version > version]
+
+    async def wait_for_changes(self, version: int, timeout: float):
+        if version != self.version:
+            return
         try:
-            response = await self._session.get(f"{self._base_url}/daddy.json", headers=self._headers())
-            response_data = response.json()
-            for data in response_data:
-                channel_id = data.get("channel_id")
-                channel_name = data.get("channel_name").replace("#", "")
-                meta = self._meta.get(channel_name, {})
-                logo = meta.get("logo", "")
-                if logo.startswith("http"):
-                    logo = f"{config.api_url}/logo/{urlsafe_base64(logo)}"
-                channels.append(Channel(id=channel_id, name=channel_name, tags=meta.get("tags", []), logo=logo))
-        finally:
-            self.channels = sorted(channels, key=lambda channel: (channel.name.startswith("18"), channel.name))
-
-    async def stream(self, channel_id: str):
+            await asyncio.wait_for(self._updated.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def resolve(self, channel_id: str, refresh: bool = False) -> tuple[str, str]:
+        cached = self._resolved.get(channel_id)
+        if cached and not refresh and cached[0] > time.monotonic():
+            return cached[1], cached[2]
+        return await self._coalesce(("resolve", channel_id), lambda: self._resolve(channel_id))
+
+    async def _coalesce(self, key: tuple, factory):
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._coalesce_done(key, done))
+        return await asyncio.shield(task)
+
+    def _coalesce_done(self, key: tuple, task: asyncio.Future):
+        self._in_flight.pop(key, None)
+        if not task.cancelled():
+            task.exception()
+
+    async def _resolve(self, channel_id: str) -> tuple[str, str]:
         key = "CHANNEL_KEY"
-        url = f"{self._base_url}/stream/stream-{channel_id}.php"
-        response = await self._session.get(url, headers=self._headers())
+        url, response = await self._from_mirrors("stream page", f"/stream/stream-{channel_id}.php", per_channel=True)
         matches = re.compile("iframe src=\"(.*)\" width").findall(response.text)
         if matches:
             source_url = matches[0]
-            source_response = await self._session.get(source_url, headers=self._headers(url))
+            source_response = await self._get("iframe", source_url, headers=self._headers(url))
         else:
             raise ValueError("Failed to find source URL for channel")
 
@@ -73,49 +190,122 @@ class StepDaddy:
         auth_rnd = data.get("b_rnd", "")
         auth_url = data.get("b_host", "")
         auth_request_url = f"{auth_url}auth.php?channel_id={channel_key}&ts={auth_ts}&rnd={auth_rnd}&sig={auth_sig}"
-        auth_response = await self._session.get(auth_request_url, headers=self._headers(source_url))
+        auth_response = await self._get("auth", auth_request_url, headers=self._headers(source_url))
         if auth_response.status_code != 200:
             raise ValueError("Failed to get auth response")
         key_url = urlparse(source_url)
         key_url = f"{key_url.scheme}://{key_url.netloc}/server_lookup.php?channel_id={channel_key}"
-        key_response = await self._session.get(key_url, headers=self._headers(source_url))
-        server_key = key_response.json().get("server_key")
+        key_response = await self._get("server_lookup", key_url, headers=self._headers(source_url))
+        server_key = loads(key_response.content).get("server_key")
         if not server_key:
             raise ValueError("No server key found in response")
         if server_key == "top1/cdn":
             server_url = f"https://top1.newkso.ru/top1/cdn/{channel_key}/mono.m3u8"
         else:
             server_url = f"https://{server_key}new.newkso.ru/{server_key}/{channel_key}/mono.m3u8"
-        m3u8 = await self._session.get(server_url, headers=self._headers(quote(str(source_url))))
+        self._resolved[channel_id] = (time.monotonic() + config.resolve_ttl, server_url, source_url)
+        return server_url, source_url
+
+    def resolve_expires_in(self, channel_id: str) -> float:
+        cached = self._resolved.get(channel_id)
+        return cached[0] - time.monotonic() if cached else 0.0
+
+    async def _playlist(self, channel_id: str) -> tuple[str, str]:
+        cached = self.resolve_expires_in(channel_id) > 0
+        server_url, source_url = await self.resolve(channel_id)
+        m3u8 = await self._get("mono.m3u8", server_url, headers=self._headers(quote(str(source_url))))
+        if m3u8.status_code != 200 and cached:
+            server_url, source_url = await self.resolve(channel_id, refresh=True)
+            m3u8 = await self._get("mono.m3u8", server_url, headers=self._headers(quote(str(source_url))))
+        if m3u8.status_code != 200:
+            self._resolved.pop(channel_id, None)
+            raise ValueError("Failed to get playlist")
+        return m3u8.text, source_url
+
+    async def _shared_playlist(self, channel_id: str, max_age: float = 0.5) -> tuple[str, str]:
+        cached = self._live.get(channel_id)
+        if cached and time.monotonic() - cached[0] < max_age:
+            return cached[1], cached[2]
+        m3u8, source_url = await self._coalesce(("playlist", channel_id), lambda: self._playlist(channel_id))
+        self._live[channel_id] = (time.monotonic(), m3u8, source_url)
+        return m3u8, source_url
+
+    async def _blocking_playlist(self, channel_id: str, msn: int) -> tuple[str, str]:
+        m3u8, source_url = await self._shared_playlist(channel_id)
+        header, _, _ = hls.parse(m3u8)
+        deadline = time.monotonic() + 3 * int(hls.tag_value(header, "#EXT-X-TARGETDURATION:") or 6)
+        while msn > hls.last_sequence(m3u8) and time.monotonic() < deadline:
+            if msn > hls.last_sequence(m3u8) + 2:
+                raise InvalidPlaylistRequest("Requested media sequence is too far ahead")
+            await asyncio.sleep(0.5)
+            m3u8, source_url = await self._shared_playlist(channel_id)
+        return m3u8, source_url
+
+    async def stream(self, channel_id: str, segments: int = 0, msn: int | None = None):
+        if msn is not None:
+            m3u8, source_url = await self._blocking_playlist(channel_id, msn)
+        else:
+            m3u8, source_url = await self._playlist(channel_id)
+        if segments > 0:
+            m3u8 = hls.trim(m3u8, segments)
+        return self.rewrite_m3u8(m3u8, source_url, channel_id)
+
+    async def warm(self, channel_id: str):
+        if self.resolve_expires_in(channel_id) < 60:
+            await self.resolve(channel_id, refresh=True)
+        m3u8, source_url = await self._playlist(channel_id)
+        host = urlparse(source_url).netloc
+        for url in set(re.findall(r'#EXT-X-KEY:.*?URI="(.*?)"', m3u8)):
+            await self._key(url, host)
+
+    @staticmethod
+    def rewrite_m3u8(m3u8: str, source_url: str, channel_id: str = "") -> str:
+        suffix = f"?c={quote(channel_id)}" if channel_id else ""
         m3u8_data = ""
-        for line in m3u8.text.split("\n"):
+        for line in m3u8.split("\n"):
             if line.startswith("#EXT-X-KEY:"):
                 original_url = re.search(r'URI="(.*?)"', line).group(1)
                 line = line.replace(original_url, f"{config.api_url}/key/{encrypt(original_url)}/{encrypt(urlparse(source_url).netloc)}")
             elif line.startswith("http") and config.proxy_content:
-                line = f"{config.api_url}/content/{encrypt(line)}"
+                line = f"{config.api_url}/content/{encrypt(line)}{suffix}"
             m3u8_data += line + "\n"
         return m3u8_data
 
+    def sweep(self):
+        now = time.monotonic()
+        self._resolved = {k: v for k, v in self._resolved.items() if v[0] > now}
+        self._keys = {k: v for k, v in self._keys.items() if v[0] > now}
+        self._live = {k: v for k, v in self._live.items() if now - v[0] < 60}
+
     async def key(self, url: str, host: str):
-        url = decrypt(url)
-        host = decrypt(host)
-        response = await self._session.get(url, headers=self._headers(f"{host}/", host), timeout=60)
+        return await self._key(decrypt(url), decrypt(host))
+
+    async def _key(self, url: str, host: str):
+        now = time.monotonic()
+        cached = self._keys.get(url)
+        if cached and cached[0] > now:
+            return cached[1]
+        response = await self._get("key", url, headers=self._headers(f"{host}/", host), timeout=60)
         if response.status_code != 200:
             raise Exception(f"Failed to get key")
+        if len(self._keys) >= 1024:
+            self._keys = {k: v for k, v in self._keys.items() if v[0] > now}
+            while len(self._keys) >= 1024:
+                self._keys.pop(next(iter(self._keys)))
+        self._keys[url] = (now + config.key_ttl, response.content)
         return response.content
 
     @staticmethod
     def content_url(path: str):
         return decrypt(path)
 
-    def playlist(self):
-        data = "#EXTM3U\n"
-        for channel in self.channels:
-            entry = f" tvg-logo=\"{channel.logo}\",{channel.name}" if channel.logo else f",{channel.name}"
+    def playlist(self, channels: list | None = None):
+        data = f"#EXTM3U url-tvg=\"{config.api_url}/epg.xml\"\n"
+        for channel in self.channels if channels is None else channels:
+            entry = f" tvg-id=\"{channel.id}\" tvg-logo=\"{channel.logo}\",{channel.name}" if channel.logo else f" tvg-id=\"{channel.id}\",{channel.name}"
             data += f"#EXTINF:-1{entry}\n{config.api_url}/stream/{channel.id}.m3u8\n"
         return data
 
     async def schedule(self):
-        response = await self._session.get(f"{self._base_url}/schedule/schedule-generated.php", headers=self._headers())
-        return response.json()
+        _, response = await self._from_mirrors("schedule", "/schedule/schedule-generated.php")
+        return loads(response.content)
@@ -0,0 +1,97 @@
+import time
+import random
+import asyncio
+
+
+class Job:
+    __slots__ = ("name", "func", "interval", "jitter", "timeout", "min_backoff", "runs", "failures", "consecutive_failures", "last_duration", "total_duration", "last_run", "last_success", "last_error", "next_run")
+
+    def __init__(self, name: str, func, interval: float, jitter: float, timeout: float | None, min_backoff: float):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.timeout = timeout
+        self.min_backoff = min_backoff
+        self.runs = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_duration = 0.0
+        self.total_duration = 0.0
+        self.last_run = 0.0
+        self.last_success = 0.0
+        self.last_error = ""
+        self.next_run = 0.0
+
+    def delay(self) -> float:
+        if self.consecutive_failures:
+            delay = min(self.min_backoff * 2 ** (self.consecutive_failures - 1), self.interval)
+        else:
+            delay = self.interval
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def as_dict(self) -> dict:
+        return {
+            "interval": self.interval,
+            "runs": self.runs,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "last_duration": round(self.last_duration, 3),
+            "avg_duration": round(self.total_duration / self.runs, 3) if self.runs else 0.0,
+            "last_run": self.last_run,
+            "last_success": self.last_success,
+            "last_error": self.last_error,
+            "next_run": self.next_run,
+        }
+
+
+class Supervisor:
+    def __init__(self):
+        self.jobs: dict[str, Job] = {}
+        self._cleanups = []
+
+    def add(self, name: str, func, interval: float, jitter: float = 0.1, timeout: float | None = None, min_backoff: float = 5, cleanup=None):
+        self.jobs[name] = Job(name, func, interval, jitter, timeout, min_backoff)
+        if cleanup is not None:
+            self._cleanups.append(cleanup)
+
+    async def _run_once(self, job: Job):
+        job.last_run = time.time()
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(job.func(), job.timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            job.failures += 1
+            job.consecutive_failures += 1
+            job.last_error = f"{type(e).__name__}: {e}"
+            print(f"Background job {job.name} failed ({job.consecutive_failures} in a row): {job.last_error}")
+        else:
+            job.consecutive_failures = 0
+            job.last_success = time.time()
+        finally:
+            job.runs += 1
+            job.last_duration = time.perf_counter() - start
+            job.total_duration += job.last_duration
+
+    async def _loop(self, job: Job):
+        while True:
+            await self._run_once(job)
+            delay = job.delay()
+            job.next_run = time.time() + delay
+            await asyncio.sleep(delay)
+
+    async def run(self):
+        tasks = [asyncio.create_task(self._loop(job), name=f"job:{job.name}") for job in self.jobs.values()]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for cleanup in self._cleanups:
+                cleanup()
+
+    def summary(self) -> dict:
+        return {name: job.as_dict() for name, job in self.jobs.items()}
@@ -0,0 +1,156 @@
+import time
+import secrets
+from collections import deque
+from contextvars import ContextVar
+from .settings import config
+
+traces = deque(maxlen=256)
+_trace = ContextVar("trace", default=None)
+_span = ContextVar("span", default=None)
+
+
+class Span:
+    __slots__ = ("trace", "name", "span_id", "parent_id", "attributes", "start", "duration", "_tokens")
+
+    def __init__(self, trace, name: str, parent_id: str | None, attributes: dict):
+        self.trace = trace
+        self.name = name
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start = 0.0
+        self.duration = 0.0
+
+    def set(self, key: str, value):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self._tokens = (_trace.set(self.trace), _span.set(self))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.attributes["error"] = f"{exc_type.__name__}: {exc}"
+        self.trace.spans.append(self)
+        _span.reset(self._tokens[1])
+        _trace.reset(self._tokens[0])
+        return False
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "offset_ms": round((self.start - self.trace.start) * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+        }
+
+
+class NoopSpan:
+    def set(self, key: str, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+noop = NoopSpan()
+
+
+class Trace:
+    __slots__ = ("trace_id", "parent_id", "start", "time", "spans")
+
+    def __init__(self, trace_id: str, parent_id: str | None):
+        self.trace_id = trace_id
+        self.parent_id = parent_id
+        self.start = time.perf_counter()
+        self.time = time.time()
+        self.spans = []
+
+    def as_dict(self) -> dict:
+        spans = sorted(self.spans, key=lambda span: span.start)
+        return {
+            "trace_id": self.trace_id,
+            "parent_id": self.parent_id,
+            "time": self.time,
+            "duration_ms": round((max((s.start + s.duration for s in spans), default=self.start) - self.start) * 1000, 3),
+            "spans": [span.as_dict() for span in spans],
+        }
+
+
+def parse_traceparent(header: str | None) -> tuple[str, str] | None:
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or parts[0] == "ff":
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    return parts[1], parts[2]
+
+
+def start_trace(name: str, traceparent: str | None = None, **attributes) -> Span | NoopSpan:
+    if not config.tracing:
+        return noop
+    parent = parse_traceparent(traceparent)
+    trace = Trace(*parent) if parent else Trace(secrets.token_hex(16), None)
+    traces.append(trace)
+    return Span(trace, name, trace.parent_id, attributes)
+
+
+def span(name: str, **attributes) -> Span | NoopSpan:
+    trace = _trace.get()
+    if trace is None:
+        return noop
+    parent = _span.get()
+    return Span(trace, name, parent.span_id if parent else None, attributes)
+
+
+def recent(limit: int = 50, min_ms: float = 0) -> list[dict]:
+    result = []
+    for trace in reversed(traces):
+        data = trace.as_dict()
+        if data["duration_ms"] >= min_ms:
+            result.append(data)
+        if len(result) >= limit:
+            break
+    return result
+
+
+class TracingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not config.tracing or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope.get("headers") or [])
+        traceparent = headers.get(b"traceparent", b"").decode("latin-1")
+        route = "/" + scope["path"].split("/")[1]
+        with start_trace(f"{scope['method']} {route}", traceparent, path=route) as root:
+            header = f"00-{root.trace.trace_id}-{root.span_id}-01".encode()
+            response_bytes = 0
+
+            async def traced_send(message):
+                nonlocal response_bytes
+                if message["type"] == "http.response.start":
+                    root.set("status", message["status"])
+                    message["headers"] = list(message.get("headers", [])) + [(b"traceparent", header)]
+                elif message["type"] == "http.response.body":
+                    response_bytes += len(message.get("body", b""))
+                await send(message)
+
+            try:
+                await self.app(scope, receive, traced_send)
+            finally:
+                root.set("bytes", response_bytes)
@@ -1,7 +1,7 @@
 import os
 import re
 import base64
-import json
+from .fastjson import loads
 
 key_bytes = os.urandom(64)
 
@@ -51,7 +51,7 @@ def extract_and_decode_var(var_name: str, response: str) -> str:
 
 def decode_bundle(bundle: str) -> dict:
     decoded_bundle = base64.b64decode(bundle).decode("utf-8")
-    data = json.loads(decoded_bundle)
+    data = loads(decoded_bundle)
     decoded = {}
     for k, v in data.items():
         if isinstance(v, str):
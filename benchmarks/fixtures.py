@@ -0,0 +1,130 @@
+import json
+import asyncio
+import argparse
+import time
+import base64
+from pathlib import Path
+
+root = Path(__file__).resolve().parent.parent
+meta_path = root / "StepDaddyLiveHD" / "meta.json"
+data_path = Path(__file__).resolve().parent / "data"
+
+target_duration = 2
+window = 6
+key_rotation = 10
+
+
+def b64(value: str) -> str:
+    return base64.b64encode(value.encode()).decode()
+
+
+def daddy_json(count: int | None = None) -> list[dict]:
+    with open(meta_path, "r") as f:
+        names = list(json.load(f))
+    if count is not None:
+        names = (names * (count // len(names) + 1))[:count]
+    return [{"channel_id": str(i + 1), "channel_name": name} for i, name in enumerate(names)]
+
+
+def stream_page(base: str, channel_id: str) -> str:
+    return f'<html><body><iframe src="{base}/premiumtv/daddy.php?id={channel_id}" width="100%" height="100%"></iframe></body></html>'
+
+
+def bundle(base: str) -> str:
+    data = {
+        "b_ts": b64(str(int(time.time()))),
+        "b_sig": b64("a" * 64),
+        "b_rnd": b64("12345678"),
+        "b_host": b64(f"{base}/"),
+    }
+    return b64(json.dumps(data))
+
+
+def iframe_page(base: str, channel_id: str) -> str:
+    return (
+        "<html><script>\n"
+        f'const CHANNEL_KEY = "premium{channel_id}";\n'
+        f'const XKZK = "{bundle(base)}";\n'
+        "</script></html>"
+    )
+
+
+def mono_m3u8(base: str, channel_key: str, now: float | None = None) -> str:
+    sequence = int((now if now is not None else time.time()) / target_duration)
+    first = sequence - window + 1
+    lines = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:3",
+        f"#EXT-X-TARGETDURATION:{target_duration}",
+        f"#EXT-X-MEDIA-SEQUENCE:{first}",
+    ]
+    current_key = None
+    for n in range(first, sequence + 1):
+        key_id = n // key_rotation
+        if key_id != current_key:
+            current_key = key_id
+            lines.append(f'#EXT-X-KEY:METHOD=AES-128,URI="{base}/keys/{channel_key}/{key_id}.key",IV=0x{n:032x}')
+        lines.append(f"#EXTINF:{target_duration}.000,")
+        lines.append(f"{base}/segments/{channel_key}/{n}.ts")
+    return "\n".join(lines) + "\n"
+
+
+def schedule_json(channels: list[dict], days: int = 2, per_category: int = 40) -> dict:
+    categories = ["Soccer", "Basketball", "Tennis", "Motorsport", "Ice Hockey", "Cricket", "Boxing", "TV Shows"]
+    schedule = {}
+    today = time.gmtime()
+    for day in range(days):
+        day_struct = time.gmtime(time.mktime(today) + day * 86400)
+        name = time.strftime("%A %dth %b %Y - Schedule Time UK GMT", day_struct)
+        schedule[name] = {}
+        for c, category in enumerate(categories):
+            events = []
+            for i in range(per_category):
+                first = channels[(c * per_category + i) % len(channels)]
+                second = channels[(c * per_category + i + 7) % len(channels)]
+                events.append({
+                    "time": f"{(i * 37) // 60 % 24:02d}:{(i * 37) % 60:02d}",
+                    "event": f"{category} Event {i} - Team {i} vs Team {i + 1}",
+                    "channels": [{"channel_name": first["channel_name"], "channel_id": first["channel_id"]}],
+                    "channels2": {"0": {"channel_name": second["channel_name"], "channel_id": second["channel_id"]}},
+                })
+            schedule[name][category] = events
+    return schedule
+
+
+def load(name: str) -> str:
+    with open(data_path / name, "r") as f:
+        return f.read()
+
+
+async def fetch_live() -> dict[str, str]:
+    from StepDaddyLiveHD.step_daddy import StepDaddy
+
+    step_daddy = StepDaddy()
+    base_url = step_daddy.mirrors.best().url
+    daddy = await step_daddy._session.get(f"{base_url}/daddy.json", headers=step_daddy._headers())
+    schedule = await step_daddy._session.get(f"{base_url}/schedule/schedule-generated.php", headers=step_daddy._headers())
+    return {"daddy.json": daddy.text, "schedule.json": schedule.text}
+
+
+def record(live: bool = False):
+    base = "https://example.com"
+    channels = daddy_json()
+    files = {
+        "daddy.json": json.dumps(channels),
+        "schedule.json": json.dumps(schedule_json(channels)),
+        "iframe.html": iframe_page(base, "1"),
+        "mono.m3u8": mono_m3u8(base, "premium1", now=1_700_000_000),
+    }
+    if live:
+        files.update(asyncio.run(fetch_live()))
+    data_path.mkdir(exist_ok=True)
+    for name, content in files.items():
+        with open(data_path / name, "w") as f:
+            f.write(content)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record the fixtures used by the benchmarks.")
+    parser.add_argument("--live", action="store_true", help="Record daddy.json and the schedule from the real upstream")
+    record(parser.parse_args().live)
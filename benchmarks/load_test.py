@@ -0,0 +1,164 @@
+import sys
+import time
+import random
+import socket
+import asyncio
+import argparse
+import subprocess
+import httpx
+import uvicorn
+from collections import defaultdict
+from . import fixtures
+from .mock_upstream import create_app
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def rss_kb(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+class Results:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def timed(self, route: str, client: httpx.AsyncClient, url: str) -> httpx.Response | None:
+        start = time.perf_counter()
+        try:
+            response = await client.get(url)
+        except httpx.HTTPError:
+            self.errors[route] += 1
+            return None
+        if response.status_code != 200:
+            self.errors[route] += 1
+            return None
+        self.latencies[route].append(time.perf_counter() - start)
+        return response
+
+
+async def player(results: Results, client: httpx.AsyncClient, backend_url: str, channel_id: str, deadline: float):
+    seen_keys = set()
+    seen_segments = set()
+    while time.monotonic() < deadline:
+        response = await results.timed("stream", client, f"{backend_url}/stream/{channel_id}.m3u8")
+        if response is not None:
+            for line in response.text.splitlines():
+                if line.startswith("#EXT-X-KEY:"):
+                    uri = line.split('URI="', 1)[1].split('"', 1)[0]
+                    if uri not in seen_keys:
+                        seen_keys.add(uri)
+                        await results.timed("key", client, uri)
+                elif line.startswith("http") and line not in seen_segments:
+                    seen_segments.add(line)
+                    await results.timed("content", client, line)
+        await asyncio.sleep(fixtures.target_duration)
+
+
+async def run(args):
+    mock_port = free_port()
+    backend_port = free_port()
+    mock_url = f"http://127.0.0.1:{mock_port}"
+    backend_url = f"http://127.0.0.1:{backend_port}"
+
+    mock = create_app(mock_url, args.channel_count, args.segment_size)
+    mock_server = uvicorn.Server(uvicorn.Config(mock, host="127.0.0.1", port=mock_port, log_level="warning"))
+    mock_task = asyncio.create_task(mock_server.serve())
+    while not mock_server.started:
+        await asyncio.sleep(0.05)
+
+    backend = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.serve_backend", "--upstream", mock_url, "--port", str(backend_port)],
+        cwd=fixtures.root,
+    )
+    try:
+        async with httpx.AsyncClient(timeout=30, limits=httpx.Limits(max_connections=args.players * 2)) as client:
+            while True:
+                try:
+                    if (await client.get(f"{backend_url}/playlist.m3u8")).text.count("#EXTINF") > 0:
+                        break
+                except httpx.HTTPError:
+                    pass
+                if backend.poll() is not None:
+                    raise SystemExit("backend exited during startup")
+                await asyncio.sleep(0.2)
+            idle_rss = rss_kb(backend.pid)
+            mock.state.requests.clear()
+            mock.state.bytes.clear()
+
+            results = Results()
+            channels = [str(i + 1) for i in range(args.channels)]
+            weights = [1 / (rank + 1) for rank in range(len(channels))]
+            random.seed(args.seed)
+            deadline = time.monotonic() + args.duration
+            players = [
+                asyncio.create_task(player(results, client, backend_url, random.choices(channels, weights)[0], deadline))
+                for _ in range(args.players)
+            ]
+            peak_rss = idle_rss
+            while not all(task.done() for task in players):
+                peak_rss = max(peak_rss, rss_kb(backend.pid))
+                await asyncio.sleep(0.5)
+            await asyncio.gather(*players)
+            final_rss = rss_kb(backend.pid)
+    finally:
+        backend.terminate()
+        backend.wait()
+        mock_server.should_exit = True
+        await mock_task
+
+    report(args, results, mock.state.requests, mock.state.bytes, idle_rss, peak_rss, final_rss)
+
+
+def report(args, results: Results, upstream_requests, upstream_bytes, idle_rss: int, peak_rss: int, final_rss: int):
+    print(f"players={args.players} channels={args.channels} duration={args.duration}s")
+    print(f"{'route':<10}{'requests':>10}{'errors':>8}{'p50 ms':>10}{'p99 ms':>10}")
+    for route in ("stream", "key", "content"):
+        latencies = results.latencies[route]
+        print(f"{route:<10}{len(latencies):>10}{results.errors[route]:>8}{percentile(latencies, 50) * 1000:>10.1f}{percentile(latencies, 99) * 1000:>10.1f}")
+
+    print("\nupstream requests")
+    for kind, count in sorted(upstream_requests.items()):
+        print(f"  {kind:<16}{count:>8}{upstream_bytes[kind] / 1024:>12.0f} KiB")
+    resolve_hops = sum(upstream_requests[kind] for kind in ("stream", "iframe", "auth", "server_lookup", "mono.m3u8"))
+    client_streams = len(results.latencies["stream"]) + results.errors["stream"]
+    client_keys = len(results.latencies["key"]) + results.errors["key"]
+    client_content = len(results.latencies["content"]) + results.errors["content"]
+    print("\namplification (upstream / client requests)")
+    print(f"  stream   {resolve_hops / max(client_streams, 1):.2f}")
+    print(f"  key      {upstream_requests['key'] / max(client_keys, 1):.2f}")
+    print(f"  content  {upstream_requests['segment'] / max(client_content, 1):.2f}")
+    print(f"\nbackend rss: idle {idle_rss / 1024:.1f} MiB, peak {peak_rss / 1024:.1f} MiB, final {final_rss / 1024:.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test fastapi_app against a local mock upstream.")
+    parser.add_argument("--players", type=int, default=50)
+    parser.add_argument("--channels", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--channel-count", type=int, default=None, help="Channels listed in the mock daddy.json")
+    parser.add_argument("--segment-size", type=int, default=256 * 1024)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
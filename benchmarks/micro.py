@@ -0,0 +1,229 @@
+import os
+import json
+import asyncio
+import timeit
+import tracemalloc
+import platform
+import argparse
+import subprocess
+from types import SimpleNamespace
+from . import fixtures
+
+baselines_path = fixtures.root / "benchmarks" / "baselines"
+cases = {}
+
+
+def case(name: str):
+    def decorator(setup):
+        cases[name] = setup
+        return setup
+    return decorator
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+        self.content = text.encode()
+        self.status_code = 200
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class FakeSession:
+    def __init__(self, text: str):
+        self._response = FakeResponse(text)
+
+    async def get(self, url: str, **kwargs):
+        return self._response
+
+
+def computed(var):
+    return getattr(var, "_fget", None) or getattr(var, "fget")
+
+
+@case("utils.encrypt")
+def bench_encrypt():
+    from StepDaddyLiveHD.utils import encrypt
+    url = "https://zekonew.newkso.ru/zeko/premium1/segments/1700000000-123456789.ts"
+    return lambda: encrypt(url)
+
+
+@case("utils.decrypt")
+def bench_decrypt():
+    from StepDaddyLiveHD.utils import encrypt, decrypt
+    path = encrypt("https://zekonew.newkso.ru/zeko/premium1/segments/1700000000-123456789.ts")
+    return lambda: decrypt(path)
+
+
+@case("utils.xor")
+def bench_xor():
+    from StepDaddyLiveHD.utils import xor
+    data = os.urandom(128)
+    return lambda: xor(data)
+
+
+@case("utils.decode_bundle")
+def bench_decode_bundle():
+    from StepDaddyLiveHD.utils import decode_bundle
+    bundle = fixtures.load("iframe.html").split('XKZK = "', 1)[1].split('"', 1)[0]
+    return lambda: decode_bundle(bundle)
+
+
+@case("StepDaddy.rewrite_m3u8")
+def bench_rewrite_m3u8():
+    from StepDaddyLiveHD.step_daddy import StepDaddy
+    m3u8 = fixtures.load("mono.m3u8")
+    return lambda: StepDaddy.rewrite_m3u8(m3u8, "https://example.com/premiumtv/daddy.php?id=1")
+
+
+@case("hls.trim")
+def bench_trim():
+    from StepDaddyLiveHD import hls
+    m3u8 = fixtures.load("mono.m3u8")
+    return lambda: hls.trim(m3u8, 3)
+
+
+@case("StepDaddy.load_channels")
+def bench_load_channels():
+    from StepDaddyLiveHD.step_daddy import StepDaddy
+    step_daddy = StepDaddy()
+    step_daddy._session = FakeSession(fixtures.load("daddy.json"))
+    loop = asyncio.new_event_loop()
+    return lambda: loop.run_until_complete(step_daddy.load_channels())
+
+
+@case("StepDaddy.playlist")
+def bench_playlist():
+    from StepDaddyLiveHD.step_daddy import StepDaddy
+    step_daddy = StepDaddy()
+    step_daddy._session = FakeSession(fixtures.load("daddy.json"))
+    asyncio.run(step_daddy.load_channels())
+    return step_daddy.playlist
+
+
+@case("channels.get_channel")
+def bench_get_channel():
+    from StepDaddyLiveHD import backend, channels
+    backend.step_daddy._session = FakeSession(fixtures.load("daddy.json"))
+    asyncio.run(backend.step_daddy.load_channels())
+    channel_id = backend.step_daddy.channels[-1].id
+    return lambda: channels.get_channel(channel_id)
+
+
+@case("State.filtered_channels")
+def bench_filtered_channels():
+    from StepDaddyLiveHD import backend, channels
+    from StepDaddyLiveHD.StepDaddyLiveHD import State
+    backend.step_daddy._session = FakeSession(fixtures.load("daddy.json"))
+    asyncio.run(backend.step_daddy.load_channels())
+    state = SimpleNamespace(channels=channels.get_channels(), search_query="sports")
+    filtered_channels = computed(State.filtered_channels)
+    return lambda: filtered_channels(state)
+
+
+@case("json.loads schedule")
+def bench_json_schedule():
+    data = fixtures.load("schedule.json").encode()
+    return lambda: json.loads(data)
+
+
+@case("fastjson.loads schedule")
+def bench_fastjson_schedule():
+    from StepDaddyLiveHD.fastjson import loads
+    data = fixtures.load("schedule.json").encode()
+    return lambda: loads(data)
+
+
+@case("json.loads daddy.json")
+def bench_json_daddy():
+    data = fixtures.load("daddy.json").encode()
+    return lambda: [(entry.get("channel_id"), entry.get("channel_name")) for entry in json.loads(data)]
+
+
+@case("fastjson.decode_daddy")
+def bench_fastjson_daddy():
+    from StepDaddyLiveHD.fastjson import decode_daddy
+    data = fixtures.load("daddy.json").encode()
+    return lambda: decode_daddy(data)
+
+
+@case("events.parse_schedule")
+def bench_parse_schedule():
+    from StepDaddyLiveHD.events import parse_schedule
+    days = json.loads(fixtures.load("schedule.json"))
+    return lambda: parse_schedule(days)
+
+
+@case("ScheduleIndex.query")
+def bench_schedule_query():
+    from datetime import datetime
+    from zoneinfo import ZoneInfo
+    from StepDaddyLiveHD.events import ScheduleIndex, parse_schedule
+    index = ScheduleIndex(*parse_schedule(json.loads(fixtures.load("schedule.json"))))
+    after = datetime.now(ZoneInfo("UTC"))
+    categories = set(index.categories[:3])
+    return lambda: index.query(categories, after, "team 1", 0, 50)
+
+
+def measure(func, repeat: int) -> dict:
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    runs = sorted(t / number * 1e6 for t in timer.repeat(repeat=repeat, number=number))
+    return {"min_us": runs[0], "median_us": runs[len(runs) // 2], "number": number}
+
+
+def allocations(func) -> dict:
+    tracemalloc.start()
+    try:
+        result = func()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return {"retained_kib": retained / 1024, "peak_kib": peak / 1024}
+
+
+def commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=fixtures.root, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the per-request hot paths.")
+    parser.add_argument("filter", nargs="?", default="", help="Only run cases containing this string")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", metavar="NAME", help="Store the results as baselines/NAME.json")
+    parser.add_argument("--compare", metavar="NAME", help="Compare against baselines/NAME.json")
+    parser.add_argument("--memory", action="store_true", help="Also trace the memory allocated by one call")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.compare:
+        with open(baselines_path / f"{args.compare}.json", "r") as f:
+            baseline = json.load(f)["results"]
+
+    results = {}
+    for name, setup in cases.items():
+        if args.filter not in name:
+            continue
+        func = setup()
+        results[name] = measure(func, args.repeat)
+        line = f"{name:<28}{results[name]['min_us']:>12.2f} us{results[name]['median_us']:>12.2f} us"
+        if name in baseline:
+            line += f"{results[name]['min_us'] / baseline[name]['min_us']:>10.2f}x"
+        if args.memory:
+            results[name].update(allocations(func))
+            line += f"{results[name]['peak_kib']:>12.1f} KiB peak"
+        print(line)
+
+    if args.save:
+        baselines_path.mkdir(exist_ok=True)
+        with open(baselines_path / f"{args.save}.json", "w") as f:
+            json.dump({"commit": commit(), "python": platform.python_version(), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import os
+from collections import Counter
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse, HTMLResponse
+from . import fixtures
+
+
+def create_app(base: str, channel_count: int | None = None, segment_size: int = 256 * 1024) -> FastAPI:
+    app = FastAPI()
+    app.state.requests = Counter()
+    app.state.bytes = Counter()
+    channels = fixtures.daddy_json(channel_count)
+    schedule = fixtures.schedule_json(channels)
+    segment = os.urandom(segment_size)
+
+    def count(kind: str, size: int = 0):
+        app.state.requests[kind] += 1
+        app.state.bytes[kind] += size
+
+    @app.get("/daddy.json")
+    async def daddy():
+        count("daddy.json")
+        return JSONResponse(channels)
+
+    @app.get("/stream/stream-{channel_id}.php")
+    async def stream_page(channel_id: str):
+        count("stream")
+        return HTMLResponse(fixtures.stream_page(base, channel_id))
+
+    @app.get("/premiumtv/daddy.php")
+    async def iframe(id: str):
+        count("iframe")
+        return HTMLResponse(fixtures.iframe_page(base, id))
+
+    @app.get("/auth.php")
+    async def auth():
+        count("auth")
+        return JSONResponse({"status": "ok"})
+
+    @app.get("/server_lookup.php")
+    async def server_lookup(channel_id: str):
+        count("server_lookup")
+        return JSONResponse({"server_key": "zeko"})
+
+    @app.get("/newkso/{host}/{server}/{channel_key}/mono.m3u8")
+    async def mono(host: str, server: str, channel_key: str):
+        count("mono.m3u8")
+        return Response(fixtures.mono_m3u8(base, channel_key), media_type="application/vnd.apple.mpegurl")
+
+    @app.get("/keys/{channel_key}/{key_id}.key")
+    async def key(channel_key: str, key_id: int):
+        count("key", 16)
+        return Response(key_id.to_bytes(16, "big"), media_type="application/octet-stream")
+
+    @app.get("/segments/{channel_key}/{sequence}.ts")
+    async def segments(channel_key: str, sequence: int):
+        count("segment", len(segment))
+        return Response(segment, media_type="video/mp2t")
+
+    @app.get("/schedule/schedule-generated.php")
+    async def schedule_page():
+        count("schedule")
+        return JSONResponse(schedule)
+
+    return app
@@ -0,0 +1,47 @@
+import os
+import asyncio
+import argparse
+from urllib.parse import urlsplit
+
+
+class RedirectingSession:
+    def __init__(self, session, upstream: str):
+        self._session = session
+        self._upstream = upstream
+
+    async def get(self, url: str, **kwargs):
+        parts = urlsplit(url)
+        if parts.netloc.endswith("newkso.ru"):
+            url = f"{self._upstream}/newkso/{parts.netloc}{parts.path}"
+            if parts.query:
+                url += f"?{parts.query}"
+        return await self._session.get(url, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run fastapi_app against a mock upstream.")
+    parser.add_argument("--upstream", required=True)
+    parser.add_argument("--port", type=int, required=True)
+    args = parser.parse_args()
+    os.environ["REFLEX_API_URL"] = f"http://127.0.0.1:{args.port}"
+
+    import uvicorn
+    from StepDaddyLiveHD import backend
+    from StepDaddyLiveHD.mirrors import MirrorPool
+
+    backend.step_daddy.mirrors = MirrorPool([args.upstream])
+    backend.step_daddy._session = RedirectingSession(backend.step_daddy._session, args.upstream)
+
+    async def serve():
+        await backend.step_daddy.load_channels()
+        server = uvicorn.Server(uvicorn.Config(backend.fastapi_app, host="127.0.0.1", port=args.port, log_level="warning"))
+        await server.serve()
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,10 @@
 import reflex as rx
-import os
+from StepDaddyLiveHD.settings import config as settings
 
 
-proxy_content = os.environ.get("PROXY_CONTENT", "TRUE").upper() == "TRUE"
-socks5 = os.environ.get("SOCKS5", "")
-
-print(f"PROXY_CONTENT: {proxy_content}\nSOCKS5: {socks5}")
-
 config = rx.Config(
     app_name="StepDaddyLiveHD",
-    proxy_content=proxy_content,
-    socks5=socks5,
+    **settings.app_settings(),
     show_built_with_reflex=False,
     plugins=[
         rx.plugins.SitemapPlugin(),